@@ -1,5 +1,6 @@
 from django.contrib import admin, messages
-from .models import Listing, Address, Booking
+from .models import Listing, Address, Booking, RateRule
+from .cache_versions import bump_version
 
 
 # from apps.booking.models import Listing
@@ -38,3 +39,19 @@ class BookingAdmin(admin.ModelAdmin):
                     ]
     # list_filter = ['check_out_date']
 
+    def delete_queryset(self, request, queryset):
+        """
+        "Удалить выбранные" не вызывает Booking.delete() - сбрасываем
+        индексы интервалов бронирований затронутых объявлений
+        """
+        listing_ids = set(queryset.values_list('listing_id', flat=True))
+        super().delete_queryset(request, queryset)
+        for listing_id in listing_ids:
+            bump_version('bookings', listing_id)
+
+
+@admin.register(RateRule)
+class RateRuleAdmin(admin.ModelAdmin):
+    list_display = ['listing_id', 'kind', 'start_date', 'end_date', 'price', 'percent',
+                    'min_nights', 'priority', 'is_active']
+    list_filter = ['kind', 'is_active']
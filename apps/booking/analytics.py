@@ -0,0 +1,101 @@
+"""
+Аналитика владельца по объявлениям за период: загрузка, ADR, RevPAR
+и выручка по месяцам.
+
+- occupancy_rate - проданные ночи / ночи в календаре;
+- adr (средняя цена проданной ночи) - выручка / проданные ночи;
+- revpar (выручка на доступную ночь) - выручка / ночи в календаре.
+
+Выручка ночи - total_amount / total_nights ее бронирования (см. occupancy).
+Результат кешируется на владельца и период; ключ включает версии
+'bookings', 'calendar' и 'pricing' всех его объявлений, поэтому любое
+изменение бронирований, календаря или самих объявлений делает кеш устаревшим.
+"""
+import hashlib
+from decimal import Decimal
+
+from django.core.cache import cache
+
+from apps.booking.cache_versions import get_versions
+from apps.booking.models import Listing
+from apps.booking.occupancy import monthly_occupancy
+
+CACHE_TIMEOUT = 60 * 60
+
+
+def _money(amount):
+    """Денежные суммы - строкой, как DecimalField в сериализаторах"""
+    return str(Decimal(amount).quantize(Decimal('0.01')))
+
+
+def _metrics(nights_total, nights_sold, revenue):
+    return {
+        'nights_available': nights_total,
+        'nights_sold': nights_sold,
+        'revenue': _money(revenue),
+        'occupancy_rate': round(nights_sold / nights_total, 4) if nights_total else 0,
+        'adr': _money(revenue / nights_sold if nights_sold else 0),
+        'revpar': _money(revenue / nights_total if nights_total else 0),
+    }
+
+
+def _compute(listings, start_date, end_date):
+    totals = monthly_occupancy(list(listings), start_date, end_date)
+
+    by_listing = {}
+    for (listing_id, month), row in sorted(totals.items(), key=lambda item: item[0][1]):
+        by_listing.setdefault(listing_id, []).append((month, row))
+
+    result = []
+    overall = [0, 0, Decimal('0')]
+    for listing_id, title in listings.items():
+        months = by_listing.get(listing_id, [])
+        nights_total = sum(row['nights_total'] for _, row in months)
+        nights_sold = sum(row['nights_sold'] for _, row in months)
+        revenue = sum((row['revenue'] for _, row in months), Decimal('0'))
+        overall[0] += nights_total
+        overall[1] += nights_sold
+        overall[2] += revenue
+
+        result.append({
+            'listing_id': listing_id,
+            'title': title,
+            **_metrics(nights_total, nights_sold, revenue),
+            'months': [
+                {'month': month.strftime('%Y-%m'),
+                 **_metrics(row['nights_total'], row['nights_sold'], row['revenue'])}
+                for month, row in months
+            ],
+        })
+
+    return {
+        'start': start_date,
+        'end': end_date,
+        'totals': _metrics(*overall),
+        'listings': result,
+    }
+
+
+def lessor_analytics(lessor, start_date, end_date):
+    """
+    Метрики объявлений владельца за [start_date, end_date).
+    Из кеша - один запрос (список объявлений); иначе еще два
+    агрегирующих запроса (итоги сжатых месяцев и живой календарь).
+    """
+    listings = dict(
+        Listing.objects.filter(lessor=lessor, is_deleted=False).order_by('id').values_list('id', 'title')
+    )
+
+    # 'pricing' увеличивается при любом сохранении объявления (например, смене названия)
+    versions = [get_versions(scope, listings) for scope in ('bookings', 'calendar', 'pricing')]
+    fingerprint = hashlib.md5(':'.join(
+        '-'.join(str(value) for value in [listing_id] + [scope[listing_id] for scope in versions])
+        for listing_id in listings
+    ).encode()).hexdigest()
+    key = f"booking:analytics:{lessor.pk}:{start_date.isoformat()}:{end_date.isoformat()}:{fingerprint}"
+
+    data = cache.get(key)
+    if data is None:
+        data = _compute(listings, start_date, end_date)
+        cache.set(key, data, CACHE_TIMEOUT)
+    return data
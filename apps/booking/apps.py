@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class BookingConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'apps.booking'
+
+    def ready(self):
+        from apps.booking import checks  # noqa: F401 - регистрация проверок
@@ -1,12 +1,71 @@
+from bisect import bisect_left
 from datetime import timedelta
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
 from django.utils import timezone
-from apps.booking.models import Calendar
+from apps.booking.enums import BookingStatus
+from apps.booking.models import Booking, Calendar, Listing
+from apps.booking.bitmap import BitmapService
+from apps.booking.cache_versions import bump_version
+from apps.booking.interval_index import BookingIntervalIndex
+
+
+class BusySnapshot:
+    """
+    Занятость группы объявлений за период [period_start, period_end),
+    загруженная двумя запросами: закрытые дни (битовые карты занятости)
+    и активные бронирования. Дальнейшие проверки выполняются в памяти.
+    """
+
+    def __init__(self, listing_ids, period_start, period_end):
+        # Занятые дни по объявлениям (отсортированы для bisect)
+        self.busy_days = {}
+        # Интервалы активных бронирований по объявлениям
+        self.bookings = {}
+        if not listing_ids or period_start >= period_end:
+            return
+
+        self.busy_days = BitmapService.busy_days(listing_ids, period_start, period_end)
+
+        for listing_id, booked_in, booked_out in Booking.objects.filter(
+            listing_id__in=listing_ids,
+            check_in_date__lt=period_end,
+            check_out_date__gt=period_start,
+            status__in=BookingStatus.active(),
+            is_deleted=False
+        ).values_list('listing_id', 'check_in_date', 'check_out_date'):
+            self.bookings.setdefault(listing_id, []).append((booked_in, booked_out))
+
+    def conflict(self, listing_id, check_in_date, check_out_date):
+        """Причина недоступности дат или None, если даты свободны"""
+        days = self.busy_days.get(listing_id, [])
+        position = bisect_left(days, check_in_date)
+        if position < len(days) and days[position] < check_out_date:
+            return f"Дата {days[position]} занята"
+
+        if any(
+            booked_in < check_out_date and booked_out > check_in_date
+            for booked_in, booked_out in self.bookings.get(listing_id, [])
+        ):
+            return "На эти даты уже есть бронирование"
+        return None
+
+    def add(self, listing_id, check_in_date, check_out_date):
+        """Учитывает бронирование, принятое в рамках того же пакета"""
+        self.bookings.setdefault(listing_id, []).append((check_in_date, check_out_date))
+
 
 class AvailabilityService:
 
     @staticmethod
     def check_availability(listing, check_in_date, check_out_date):
         """
+        Единая проверка доступности для всех точек входа
+        (BookingViewSet, CalendarViewSet, BookingCreateSerializer).
+        listing - объект или его id. Не более одного запроса к БД.
+        Если объявления нет - Listing.DoesNotExist.
+
         Проверяет доступность дат с учетом правила "выезд до 10, заезд после 14"
         Пример:
         - check_in_date = 15 декабря (заезд после 14:00 15-го)
@@ -22,57 +81,311 @@ class AvailabilityService:
         if check_in_date < timezone.now().date():
             return False, "Дата заезда должна быть в будущем"
 
-        # 2. Проверяем календарь
-        dates_to_check = []
-        current_date = check_in_date
-
-        while current_date < check_out_date:
-            dates_to_check.append(current_date)
-            current_date += timedelta(days=1)
-
-        # 3. Проверяем каждую дату в календаре
-        for date in dates_to_check:
-            try:
-                calendar_entry = Calendar.objects.get(
-                    listing=listing,
-                    target_date=date
-                )
-                if not calendar_entry.is_available:
-                    return False, f"Дата {date} занята"
-            except Calendar.DoesNotExist:
-                Calendar.objects.create(
-                    listing=listing,
-                    target_date=date,
-                    is_available=True
-                )
+        range_error = AvailabilityService.range_error(check_in_date, check_out_date)
+        if range_error:
+            return False, range_error
+
+        listing_id = getattr(listing, 'pk', listing)
+
+        # 2. Быстрый отказ по уже построенному индексу бронирований (без запросов)
+        index = BookingIntervalIndex.cached(listing_id)
+        if index is not None and index.overlaps(check_in_date, check_out_date):
+            return False, "На эти даты уже есть бронирование"
+
+        # 3. Один запрос: битовые карты занятости за годы диапазона
+        # и пересекающиеся активные бронирования. Занятые ночи ищутся
+        # битовой маской в памяти; отсутствующая карта - все ночи свободны.
+        bitmaps = BitmapService.annotations(check_in_date, check_out_date)
+        conflicting = Booking.objects.filter(
+            listing=OuterRef('pk'),
+            check_in_date__lt=check_out_date,
+            check_out_date__gt=check_in_date,
+            status__in=BookingStatus.active(),
+            is_deleted=False
+        )
+
+        row = Listing.objects.filter(pk=listing_id).annotate(
+            has_booking=Exists(conflicting),
+            **bitmaps
+        ).values('has_booking', *bitmaps).first()
+
+        if row is None:
+            raise Listing.DoesNotExist(f"Объявление {listing_id} не найдено")
+        busy_date = BitmapService.first_busy_date(row, check_in_date, check_out_date)
+        if busy_date:
+            return False, f"Дата {busy_date} занята"
+        if row['has_booking']:
+            return False, "На эти даты уже есть бронирование"
 
         return True, "Даты доступны"
 
+    @staticmethod
+    def range_error(check_in_date, check_out_date):
+        """
+        Ограничение длины проверяемого периода: текст ошибки или None.
+        Проверка добавляет в запрос подзапрос битовой карты на каждый
+        календарный год периода, поэтому период не длиннее горизонта календаря.
+        """
+        if (check_out_date - check_in_date).days > settings.CALENDAR_HORIZON_DAYS:
+            return f"Период проверки - не более {settings.CALENDAR_HORIZON_DAYS} ночей"
+        return None
+
+    @staticmethod
+    def lock_listing(listing_id):
+        """
+        Блокирует строку объявления (SELECT ... FOR UPDATE) до конца текущей
+        транзакции. Вызывать первым запросом внутри transaction.atomic(),
+        чтобы последующие чтения видели брони, зафиксированные до блокировки.
+        """
+        list(Listing.objects.select_for_update().filter(pk=listing_id).values_list('pk', flat=True))
+
+    @staticmethod
+    def check_availability_batch(items):
+        """
+        Пакетная проверка доступности для списка
+        {'listing_id', 'check_in_date', 'check_out_date'}.
+        Не более 3 запросов на весь пакет независимо от его размера:
+        объявления, занятые дни календаря и пересекающиеся бронирования.
+        Возвращает список (is_available, message) в порядке items.
+        """
+        today = timezone.now().date()
+        period_start = min(item['check_in_date'] for item in items)
+        period_end = max(item['check_out_date'] for item in items)
+
+        # 1. Существующие объявления
+        existing = set(
+            Listing.objects.filter(
+                id__in={item['listing_id'] for item in items}
+            ).values_list('id', flat=True)
+        )
+        # 2-3. Занятые дни календаря и пересекающиеся бронирования
+        snapshot = BusySnapshot(existing, period_start, period_end)
+
+        results = []
+        for item in items:
+            listing_id = item['listing_id']
+            check_in_date = item['check_in_date']
+            check_out_date = item['check_out_date']
+
+            if listing_id not in existing:
+                results.append((False, "Объявление не найдено"))
+                continue
+            if check_in_date >= check_out_date:
+                results.append((False, "Дата выезда должна быть позже даты заезда"))
+                continue
+            if check_in_date < today:
+                results.append((False, "Дата заезда должна быть в будущем"))
+                continue
+
+            conflict = snapshot.conflict(listing_id, check_in_date, check_out_date)
+            if conflict:
+                results.append((False, conflict))
+                continue
+
+            results.append((True, "Даты доступны"))
+
+        return results
+
+    @staticmethod
+    def find_windows(listing, start_date, nights=1, count=5, horizon_days=365):
+        """
+        Ближайшие count свободных окон длиной не меньше nights ночей
+        в [start_date, start_date + horizon_days) одним проходом по занятым
+        интервалам (активные бронирования + закрытые дни из битовых карт).
+        Учитывает min_stay_days/max_stay_days и available_from/available_until.
+        Возвращает список {'start', 'end', 'nights', 'max_nights'}.
+        """
+        min_nights = max(nights, listing.min_stay_days or 1)
+        start_date = max(start_date, timezone.now().date(), listing.available_from)
+        end_date = start_date + timedelta(days=horizon_days)
+        if listing.available_until:
+            end_date = min(end_date, listing.available_until + timedelta(days=1))
+        if start_date >= end_date:
+            return []
+
+        bookings_index = BookingIntervalIndex.for_listing(listing.pk)
+        closed_days = BitmapService.busy_days([listing.pk], start_date, end_date).get(listing.pk, [])
+
+        busy = BookingIntervalIndex(
+            list(zip(bookings_index.starts, bookings_index.ends)) +
+            [(day, day + timedelta(days=1)) for day in closed_days]
+        )
+
+        windows = []
+        for gap_start, gap_end in busy.gaps(start_date, end_date):
+            length = (gap_end - gap_start).days
+            if length < min_nights:
+                continue
+            windows.append({
+                'start': gap_start,
+                'end': gap_end,
+                'nights': length,
+                'max_nights': min(length, listing.max_stay_days) if listing.max_stay_days else length,
+            })
+            if len(windows) >= count:
+                break
+        return windows
+
+    @staticmethod
+    def calendar_spans(listing, start_date, end_date):
+        """
+        Занятость объявления в [start_date, end_date) в виде RLE-отрезков
+        {'start', 'end' (не включительно), 'state', 'booking_id'}.
+        Один упорядоченный запрос; дни без записи считаются свободными.
+        Возвращает (spans, last_updated, rows_count) - последние два для ETag.
+        """
+        rows = Calendar.objects.filter(
+            listing=listing,
+            target_date__gte=start_date,
+            target_date__lt=end_date
+        ).order_by('target_date').values_list(
+            'target_date', 'is_available', 'booking_id', 'updated_at'
+        )
+
+        spans = []
+        last_updated = None
+        rows_count = 0
+        current_date = start_date
+
+        def extend(day_from, day_to, state, booking_id):
+            if day_from >= day_to:
+                return
+            if spans and spans[-1]['end'] == day_from and \
+                    spans[-1]['state'] == state and spans[-1]['booking_id'] == booking_id:
+                spans[-1]['end'] = day_to
+            else:
+                spans.append({'start': day_from, 'end': day_to, 'state': state, 'booking_id': booking_id})
+
+        for target_date, is_available, booking_id, updated_at in rows:
+            rows_count += 1
+            if last_updated is None or updated_at > last_updated:
+                last_updated = updated_at
+            # Пропуск в календаре - свободные дни
+            extend(current_date, target_date, 'free', None)
+            if is_available:
+                extend(target_date, target_date + timedelta(days=1), 'free', None)
+            else:
+                extend(target_date, target_date + timedelta(days=1), 'busy', booking_id)
+            current_date = target_date + timedelta(days=1)
+
+        extend(current_date, end_date, 'free', None)
+        return spans, last_updated, rows_count
+
     @staticmethod
     def block_dates(listing, check_in_date, check_out_date, booking):
         """
-        Блокирует даты в календаре при создании бронирования
+        Блокирует даты в календаре при создании бронирования.
+        Фиксированное число запросов независимо от длины проживания:
+        bulk insert недостающих ночей + один UPDATE по диапазону.
         """
-        current_date = check_in_date
+        nights = [
+            check_in_date + timedelta(days=offset)
+            for offset in range((check_out_date - check_in_date).days)
+        ]
+        if not nights:
+            return
 
-        while current_date < check_out_date:
-            Calendar.objects.update_or_create(
-                listing=listing,
-                target_date=current_date,
-                defaults={
-                    'is_available': False,
-                    'booking': booking
-                }
+        with transaction.atomic():
+            # Существующие записи пропускаются благодаря unique_together (listing, target_date)
+            Calendar.objects.bulk_create(
+                [
+                    Calendar(
+                        listing=listing,
+                        target_date=night,
+                        is_available=False,
+                        booking=booking
+                    )
+                    for night in nights
+                ],
+                ignore_conflicts=True
             )
-            current_date += timedelta(days=1)
+            # Уже существовавшие записи блокируем одним запросом
+            Calendar.objects.filter(
+                listing=listing,
+                target_date__gte=check_in_date,
+                target_date__lt=check_out_date
+            ).update(is_available=False, booking=booking, updated_at=timezone.now())
+            BitmapService.mark_range(listing.pk, check_in_date, check_out_date, busy=True)
+        bump_version('calendar', listing.pk)
 
     @staticmethod
     def free_dates(listing, check_in_date, check_out_date):
         """
-        Освобождает даты в календаре при отмене бронирования
+        Освобождает даты в календаре при отмене бронирования.
+        Возвращает количество освобожденных ночей.
         """
-        Calendar.objects.filter(
-            listing=listing,
-            target_date__gte=check_in_date,
-            target_date__lt=check_out_date
-        ).update(is_available=True, booking=None)
+        with transaction.atomic():
+            released = Calendar.objects.filter(
+                listing=listing,
+                target_date__gte=check_in_date,
+                target_date__lt=check_out_date,
+                is_available=False
+            ).update(is_available=True, booking=None, updated_at=timezone.now())
+            BitmapService.mark_range(listing.pk, check_in_date, check_out_date, busy=False)
+        bump_version('calendar', listing.pk)
+        return released
+
+    @staticmethod
+    def block_many(stays, batch_size=1000):
+        """
+        Блокирует ночи сразу для многих бронирований (импорт, пакетные операции).
+        stays - список (listing_id, check_in_date, check_out_date, booking_id).
+        Записи календаря вставляются пачками как upsert по (listing, target_date),
+        битовые карты обновляются одним проходом. Возвращает число ночей.
+        """
+        rows = [
+            Calendar(
+                listing_id=listing_id,
+                target_date=check_in_date + timedelta(days=offset),
+                is_available=False,
+                booking_id=booking_id
+            )
+            for listing_id, check_in_date, check_out_date, booking_id in stays
+            for offset in range((check_out_date - check_in_date).days)
+        ]
+        if not rows:
+            return 0
+
+        options = {
+            'update_conflicts': True,
+            'update_fields': ['is_available', 'booking', 'updated_at'],
+        }
+        # MySQL не поддерживает явную цель ON CONFLICT - конфликт ищется по любому уникальному ключу
+        if connection.features.supports_update_conflicts_with_target:
+            options['unique_fields'] = ['listing', 'target_date']
+
+        with transaction.atomic():
+            Calendar.objects.bulk_create(rows, batch_size=batch_size, **options)
+            BitmapService.mark_ranges(
+                [(listing_id, check_in_date, check_out_date)
+                 for listing_id, check_in_date, check_out_date, _ in stays],
+                busy=True
+            )
+        for listing_id in {stay[0] for stay in stays}:
+            bump_version('calendar', listing_id)
+        return len(rows)
+
+    @staticmethod
+    def free_many(stays, batch_size=1000):
+        """
+        Освобождает ночи сразу многих бронирований (пакетная отмена/отклонение).
+        stays - список (listing_id, check_in_date, check_out_date, booking_id).
+        Освобождаются записи, привязанные к этим бронированиям.
+        Возвращает количество освобожденных ночей.
+        """
+        booking_ids = [stay[3] for stay in stays]
+        released = 0
+        with transaction.atomic():
+            for offset in range(0, len(booking_ids), batch_size):
+                released += Calendar.objects.filter(
+                    booking_id__in=booking_ids[offset:offset + batch_size],
+                    is_available=False
+                ).update(is_available=True, booking=None, updated_at=timezone.now())
+            BitmapService.mark_ranges(
+                [(listing_id, check_in_date, check_out_date)
+                 for listing_id, check_in_date, check_out_date, _ in stays],
+                busy=False
+            )
+        for listing_id in {stay[0] for stay in stays}:
+            bump_version('calendar', listing_id)
+        return released
@@ -0,0 +1,272 @@
+from calendar import monthrange
+from datetime import date, timedelta
+
+from django.db import transaction
+from django.db.models import OuterRef, Subquery
+
+from apps.booking.models import AvailabilityBitmap, Calendar, Listing
+
+YEAR_BYTES = 46  # 366 бит на високосный год
+
+
+def day_index(target_date):
+    """Номер ночи внутри года (0 = 1 января)"""
+    return target_date.timetuple().tm_yday - 1
+
+
+def range_mask(start_index, end_index):
+    """Маска бит [start_index, end_index)"""
+    if end_index <= start_index:
+        return 0
+    return ((1 << (end_index - start_index)) - 1) << start_index
+
+
+def index_date(year, index):
+    """Дата ночи по номеру внутри года (обратное к day_index)"""
+    return date(year, 1, 1) + timedelta(days=index)
+
+
+def split_by_year(start_date, end_date):
+    """
+    Разбивает диапазон ночей [start_date, end_date) на отрезки по годам.
+    Возвращает список (year, start_index, end_index).
+    """
+    segments = []
+    current = start_date
+    while current < end_date:
+        next_year = date(current.year + 1, 1, 1)
+        segment_end = min(end_date, next_year)
+        last_index = day_index(segment_end - timedelta(days=1)) + 1
+        segments.append((current.year, day_index(current), last_index))
+        current = segment_end
+    return segments
+
+
+class YearBitmap:
+    """Занятость одного объявления за год в виде целого числа (бит = ночь)"""
+
+    def __init__(self, year, bits=b''):
+        self.year = year
+        self.value = int.from_bytes(bytes(bits or b''), 'little')
+
+    def to_bytes(self):
+        return self.value.to_bytes(YEAR_BYTES, 'little')
+
+    def set_busy(self, start_index, end_index):
+        self.value |= range_mask(start_index, end_index)
+
+    def set_free(self, start_index, end_index):
+        self.value &= ~range_mask(start_index, end_index)
+
+    def is_free(self, start_index, end_index):
+        return not self.value & range_mask(start_index, end_index)
+
+    def first_busy(self, start_index, end_index):
+        """Номер первой занятой ночи в [start_index, end_index) или None"""
+        masked = self.value & range_mask(start_index, end_index)
+        if not masked:
+            return None
+        return (masked & -masked).bit_length() - 1
+
+    def busy_indexes(self, start_index, end_index):
+        """Номера занятых ночей в [start_index, end_index) по возрастанию"""
+        masked = self.value & range_mask(start_index, end_index)
+        while masked:
+            lowest = masked & -masked
+            yield lowest.bit_length() - 1
+            masked ^= lowest
+
+    def busy_nights(self, start_index, end_index):
+        return (self.value & range_mask(start_index, end_index)).bit_count()
+
+    def free_nights(self, start_index, end_index):
+        return (end_index - start_index) - self.busy_nights(start_index, end_index)
+
+    def overlaps(self, other):
+        """Есть ли общие занятые ночи с другой картой того же года"""
+        return bool(self.value & other.value)
+
+
+class BitmapService:
+
+    @staticmethod
+    def load(listing_id, years, for_update=False):
+        """Загружает карты за указанные годы одним запросом: {year: YearBitmap}"""
+        queryset = AvailabilityBitmap.objects.filter(listing_id=listing_id, year__in=years)
+        if for_update:
+            queryset = queryset.select_for_update()
+        bitmaps = {year: YearBitmap(year) for year in years}
+        for year, bits in queryset.values_list('year', 'bits'):
+            bitmaps[year] = YearBitmap(year, bits)
+        return bitmaps
+
+    @staticmethod
+    def busy_days(listing_ids, start_date, end_date):
+        """
+        Занятые ночи [start_date, end_date) группы объявлений одним запросом:
+        {listing_id: [date, ...]} по возрастанию дат.
+        """
+        segments = split_by_year(start_date, end_date)
+        bounds = {year: (start_index, end_index) for year, start_index, end_index in segments}
+        result = {}
+        if not listing_ids or not segments:
+            return result
+        for listing_id, year, bits in AvailabilityBitmap.objects.filter(
+            listing_id__in=listing_ids,
+            year__in=bounds
+        ).order_by('listing_id', 'year').values_list('listing_id', 'year', 'bits'):
+            days = result.setdefault(listing_id, [])
+            days.extend(
+                index_date(year, index)
+                for index in YearBitmap(year, bits).busy_indexes(*bounds[year])
+            )
+        return result
+
+    @staticmethod
+    def annotations(start_date, end_date, listing_ref='pk'):
+        """
+        Подзапросы битов карт за годы диапазона для annotate() по объявлениям:
+        {'bitmap_<year>': Subquery}. Вместе с first_busy_date позволяют
+        проверить диапазон в том же запросе, что и остальные условия.
+        """
+        return {
+            f'bitmap_{year}': Subquery(
+                AvailabilityBitmap.objects.filter(
+                    listing_id=OuterRef(listing_ref), year=year
+                ).values('bits')[:1]
+            )
+            for year, _, _ in split_by_year(start_date, end_date)
+        }
+
+    @staticmethod
+    def first_busy_date(row, start_date, end_date):
+        """Первая занятая ночь [start_date, end_date) по строке с annotations() или None"""
+        for year, start_index, end_index in split_by_year(start_date, end_date):
+            index = YearBitmap(year, row[f'bitmap_{year}']).first_busy(start_index, end_index)
+            if index is not None:
+                return index_date(year, index)
+        return None
+
+    @staticmethod
+    def mark_range(listing_id, start_date, end_date, busy):
+        """
+        Помечает ночи [start_date, end_date) занятыми или свободными.
+        Один SELECT ... FOR UPDATE и по одному INSERT/UPDATE на затронутый год.
+        """
+        BitmapService.mark_ranges([(listing_id, start_date, end_date)], busy)
+
+    @staticmethod
+    def mark_ranges(ranges, busy):
+        """
+        Пакетный вариант mark_range для списка (listing_id, start_date, end_date):
+        один SELECT ... FOR UPDATE на все затронутые карты, затем bulk UPDATE
+        и bulk INSERT независимо от количества диапазонов.
+        """
+        segments = {}
+        for listing_id, start_date, end_date in ranges:
+            for year, start_index, end_index in split_by_year(start_date, end_date):
+                segments.setdefault((listing_id, year), []).append((start_index, end_index))
+        if not segments:
+            return
+
+        with transaction.atomic():
+            rows = {
+                (row.listing_id, row.year): row
+                for row in AvailabilityBitmap.objects.select_for_update().filter(
+                    listing_id__in={listing_id for listing_id, _ in segments},
+                    year__in={year for _, year in segments}
+                )
+            }
+            to_create = []
+            to_update = []
+            for (listing_id, year), bounds in segments.items():
+                row = rows.get((listing_id, year))
+                bitmap = YearBitmap(year, row.bits if row else b'')
+                for start_index, end_index in bounds:
+                    if busy:
+                        bitmap.set_busy(start_index, end_index)
+                    else:
+                        bitmap.set_free(start_index, end_index)
+
+                if row:
+                    row.bits = bitmap.to_bytes()
+                    to_update.append(row)
+                else:
+                    to_create.append(AvailabilityBitmap(
+                        listing_id=listing_id,
+                        year=year,
+                        bits=bitmap.to_bytes()
+                    ))
+
+            if to_update:
+                AvailabilityBitmap.objects.bulk_update(to_update, ['bits', 'updated_at'], batch_size=1000)
+            if to_create:
+                AvailabilityBitmap.objects.bulk_create(to_create, batch_size=1000)
+
+    @staticmethod
+    def is_range_free(listing_id, start_date, end_date):
+        """Свободны ли все ночи [start_date, end_date): один запрос + битовые операции"""
+        segments = split_by_year(start_date, end_date)
+        bitmaps = BitmapService.load(listing_id, [year for year, _, _ in segments])
+        return all(
+            bitmaps[year].is_free(start_index, end_index)
+            for year, start_index, end_index in segments
+        )
+
+    @staticmethod
+    def free_nights_in_month(listing_id, year, month):
+        """Количество свободных ночей в месяце"""
+        first = date(year, month, 1)
+        last = first + timedelta(days=monthrange(year, month)[1])
+        (segment,) = split_by_year(first, last)
+        bitmap = BitmapService.load(listing_id, [year])[year]
+        return bitmap.free_nights(segment[1], segment[2])
+
+    @staticmethod
+    def rebuild(listing_ids=None, chunk_size=500):
+        """
+        Пересобирает карты из занятых записей Calendar пачками по chunk_size
+        объявлений (keyset по id): в памяти только записи и карты одной пачки,
+        на пачку - одна транзакция.
+        Возвращает количество записанных карт.
+        """
+        listings = Listing.objects.order_by('id').values_list('id', flat=True)
+        if listing_ids is not None:
+            listings = listings.filter(id__in=listing_ids)
+
+        written = 0
+        last_id = 0
+        while True:
+            chunk = list(listings.filter(id__gt=last_id)[:chunk_size])
+            if not chunk:
+                break
+            last_id = chunk[-1]
+
+            with transaction.atomic():
+                # Блокируем существующие карты пачки, чтобы параллельные
+                # mark_ranges не потерялись между чтением Calendar и записью
+                list(AvailabilityBitmap.objects.select_for_update().filter(
+                    listing_id__in=chunk
+                ).values_list('id', flat=True))
+
+                bitmaps = {}
+                for listing_id, target_date in Calendar.objects.filter(
+                    listing_id__in=chunk,
+                    is_available=False
+                ).values_list('listing_id', 'target_date').order_by():
+                    key = (listing_id, target_date.year)
+                    if key not in bitmaps:
+                        bitmaps[key] = YearBitmap(target_date.year)
+                    index = day_index(target_date)
+                    bitmaps[key].set_busy(index, index + 1)
+
+                AvailabilityBitmap.objects.filter(listing_id__in=chunk).delete()
+                AvailabilityBitmap.objects.bulk_create(
+                    [
+                        AvailabilityBitmap(listing_id=listing_id, year=year, bits=bitmap.to_bytes())
+                        for (listing_id, year), bitmap in bitmaps.items()
+                    ],
+                    batch_size=1000
+                )
+            written += len(bitmaps)
+        return written
@@ -0,0 +1,57 @@
+"""
+Версии кешируемых данных по объявлению (или другому ключу).
+Любое изменение данных увеличивает версию, и все кеши, построенные
+на старой версии, считаются устаревшими.
+
+Версии хранятся в кеше Django (CACHES), который обязан быть общим для
+всех процессов - веб-воркеров и cron-команд (см. checks.booking_cache_check):
+иначе изменения из команд не видны воркерам. Версия увеличивается только
+после фиксации транзакции, чтобы параллельный читатель не закешировал
+под новой версией еще не зафиксированное (или откаченное) состояние.
+"""
+import time
+from functools import partial
+
+from django.core.cache import cache
+from django.db import transaction
+
+
+def _key(scope, key):
+    return f"booking:version:{scope}:{key}"
+
+
+def get_version(scope, key):
+    """Текущая версия данных scope для key"""
+    cache_key = _key(scope, key)
+    version = cache.get(cache_key)
+    if version is None:
+        # Начальное значение от времени: после вытеснения ключа из кеша
+        # версия не совпадет ни с одной из выданных ранее
+        cache.add(cache_key, time.time_ns())
+        version = cache.get(cache_key)
+    return version
+
+
+def get_versions(scope, keys):
+    """get_version для многих ключей одним обращением к кешу: {key: version}"""
+    cache_keys = {_key(scope, key): key for key in keys}
+    found = cache.get_many(list(cache_keys))
+    return {
+        key: found[cache_key] if cache_key in found else get_version(scope, key)
+        for cache_key, key in cache_keys.items()
+    }
+
+
+def _bump(cache_key):
+    try:
+        cache.incr(cache_key)
+    except ValueError:
+        cache.set(cache_key, time.time_ns())
+
+
+def bump_version(scope, key):
+    """
+    Помечает данные scope для key измененными. Внутри транзакции -
+    после ее фиксации (при откате версия не меняется), вне - сразу.
+    """
+    transaction.on_commit(partial(_bump, _key(scope, key)))
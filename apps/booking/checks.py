@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, register
+
+# Бэкенды, данные которых видит только процесс, в котором они записаны
+PROCESS_LOCAL_CACHES = (
+    'django.core.cache.backends.locmem.LocMemCache',
+    'django.core.cache.backends.dummy.DummyCache',
+)
+
+
+@register(Tags.caches)
+def booking_cache_check(app_configs, **kwargs):
+    """
+    Версии кешей (cache_versions) должны быть общими для веб-воркеров
+    и cron-команд, иначе воркеры не узнают об изменениях из команд.
+    """
+    backend = settings.CACHES.get('default', {}).get('BACKEND')
+    if backend in PROCESS_LOCAL_CACHES:
+        return [Error(
+            f"Кеш default ({backend}) виден только своему процессу",
+            hint="Укажите в CACHE_URL общий кеш: redis, memcached, dbcache или filecache",
+            id='booking.E001',
+        )]
+    return []
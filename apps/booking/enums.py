@@ -105,3 +105,24 @@ class BookingStatus(StrEnum):
             cls.REJECTED : 'rejected by lessor',
         }
         return [(item.value, human_readable[item]) for item in cls]
+
+    @classmethod
+    def active(cls):
+        """Статусы, при которых бронирование занимает даты"""
+        return [cls.PENDING.value, cls.CONFIRMED.value, cls.ACTIVE.value]
+
+class RateRuleKind(StrEnum):
+    SEASON = 'season'
+    WEEKEND = 'weekend'
+    OVERRIDE = 'override'
+    LENGTH_OF_STAY = 'length_of_stay'
+
+    @classmethod
+    def choices(cls):
+        human_readable = {
+            cls.SEASON: 'Сезонная цена',
+            cls.WEEKEND: 'Наценка на выходные',
+            cls.OVERRIDE: 'Цена на конкретные даты',
+            cls.LENGTH_OF_STAY: 'Скидка за длительность',
+        }
+        return [(item.value, human_readable[item]) for item in cls]
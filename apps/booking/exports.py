@@ -0,0 +1,131 @@
+"""
+Потоковая выгрузка бронирований в CSV и JSON Lines (бухгалтерия, сверки).
+
+Строки читаются через .values_list() без моделей и связанных объектов,
+порциями по chunk_size с постраничной выборкой по id (id > последнего),
+и сразу превращаются в текст. Серверный курсор (.iterator()) здесь не
+подходит: mysqlclient буферизует весь результат на клиенте. В памяти
+в каждый момент только одна порция, поэтому расход памяти не зависит
+от размера выгрузки.
+"""
+import csv
+from datetime import date, datetime
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from apps.booking.models import Booking
+
+FORMATS = ('csv', 'jsonl')
+CONTENT_TYPES = {
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+}
+CHUNK_SIZE = 2000
+
+# Колонки выгрузки: (имя колонки, выражение для .values())
+COLUMNS = (
+    ('id', 'id'),
+    ('booking_code', 'booking_code'),
+    ('status', 'status'),
+    ('listing_id', 'listing_id'),
+    ('listing_title', 'listing__title'),
+    ('lessee_id', 'lessee_id'),
+    ('check_in_date', 'check_in_date'),
+    ('check_out_date', 'check_out_date'),
+    ('total_nights', 'total_nights'),
+    ('number_of_guests', 'number_of_guests'),
+    ('price', 'price'),
+    ('total_amount', 'total_amount'),
+    ('is_paid', 'is_paid'),
+    ('is_deposit_returned', 'is_deposit_returned'),
+    ('guest_first_name', 'guest_first_name'),
+    ('guest_last_name', 'guest_last_name'),
+    ('guest_email', 'guest_email'),
+    ('guest_phone', 'guest_phone'),
+    ('created_at', 'created_at'),
+    ('confirmed_at', 'confirmed_at'),
+    ('cancelled_at', 'cancelled_at'),
+    ('completed_at', 'completed_at'),
+    ('cancellation_reason', 'cancellation_reason'),
+)
+
+
+def export_queryset(lessor=None, status=None, listing_id=None, check_in_from=None, check_in_to=None):
+    """
+    Бронирования для выгрузки. lessor - только по его объявлениям
+    (None - все, для администраторов). check_in_to не включается.
+    """
+    queryset = Booking.objects.filter(is_deleted=False)
+    if lessor is not None:
+        queryset = queryset.filter(listing__lessor=lessor)
+    if status:
+        queryset = queryset.filter(status=status)
+    if listing_id:
+        queryset = queryset.filter(listing_id=listing_id)
+    if check_in_from:
+        queryset = queryset.filter(check_in_date__gte=check_in_from)
+    if check_in_to:
+        queryset = queryset.filter(check_in_date__lt=check_in_to)
+    return queryset
+
+
+def iter_rows(queryset, chunk_size=CHUNK_SIZE):
+    """
+    Кортежи значений в порядке COLUMNS, порциями по chunk_size:
+    на порцию один запрос по первичному ключу.
+    """
+    rows = queryset.order_by('id').values_list(*(expression for _, expression in COLUMNS))
+    last_id = 0
+    while True:
+        chunk = list(rows.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            return
+        last_id = chunk[-1][0]
+        yield from chunk
+
+
+class _Echo:
+    """Псевдо-файл для csv.writer: write() возвращает строку, а не пишет ее"""
+
+    def write(self, value):
+        return value
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    return value
+
+
+def _csv_lines(rows):
+    writer = csv.writer(_Echo())
+    yield writer.writerow([name for name, _ in COLUMNS])
+    for row in rows:
+        yield writer.writerow([_csv_value(value) for value in row])
+
+
+def _jsonl_lines(rows):
+    names = [name for name, _ in COLUMNS]
+    encoder = DjangoJSONEncoder(ensure_ascii=False)
+    for row in rows:
+        yield encoder.encode(dict(zip(names, row))) + '\n'
+
+
+def export_lines(queryset, fmt, chunk_size=CHUNK_SIZE):
+    """
+    Текст выгрузки по частям. Строки склеиваются по chunk_size штук,
+    чтобы не отдавать клиенту и не писать в файл по одной короткой строке.
+    """
+    rows = iter_rows(queryset, chunk_size)
+    lines = _csv_lines(rows) if fmt == 'csv' else _jsonl_lines(rows)
+
+    buffer = []
+    for line in lines:
+        buffer.append(line)
+        if len(buffer) >= chunk_size:
+            yield ''.join(buffer)
+            buffer = []
+    if buffer:
+        yield ''.join(buffer)
@@ -0,0 +1,135 @@
+"""
+Поддержка заголовка Idempotency-Key для небезопасных запросов.
+Повтор запроса с тем же ключом возвращает сохраненный ответ, не выполняя
+действие повторно. Ключи хранятся в таблице IdempotencyKey (общей для всех
+воркеров) и удаляются по истечении IDEMPOTENCY_KEY_TTL_HOURS. Действие
+выполняется в одной транзакции с сохранением ответа, поэтому по одному
+ключу действие выполняется не больше одного раза, даже если воркер упал.
+"""
+import hashlib
+import json
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import DatabaseError, IntegrityError, transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.response import Response
+
+from apps.booking.models import IdempotencyKey
+
+HEADER = 'Idempotency-Key'
+
+
+def _request_hash(request):
+    body = json.dumps(request.data, sort_keys=True, cls=DjangoJSONEncoder, default=str)
+    return hashlib.sha256(body.encode()).hexdigest()
+
+
+def _replay(record):
+    return Response(record.response_body, status=record.status_code,
+                    headers={'Idempotent-Replayed': 'true'})
+
+
+def _in_progress():
+    return Response({'error': 'Запрос с этим ключом еще выполняется'},
+                    status=status.HTTP_409_CONFLICT)
+
+
+def _release(record):
+    """Действие откатилось - повтор с тем же ключом допустим, в том числе с другим телом"""
+    IdempotencyKey.objects.filter(pk=record.pk, status_code__isnull=True).delete()
+
+
+def idempotent(view_method):
+    """Декоратор метода ViewSet: включает обработку Idempotency-Key"""
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        key = request.headers.get(HEADER)
+        if not key:
+            return view_method(self, request, *args, **kwargs)
+        if len(key) > 255:
+            return Response({'error': f'{HEADER} длиннее 255 символов'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        user = request.user.pk if request.user.is_authenticated else 'anon'
+        scope = f"{user}:{request.method}:{request.path}"[:255]
+        request_hash = _request_hash(request)
+        now = timezone.now()
+
+        record = IdempotencyKey.objects.filter(key=key, scope=scope).first()
+        if record and record.expires_at <= now:
+            record.delete()
+            record = None
+
+        if record:
+            if record.request_hash != request_hash:
+                return Response({'error': f'{HEADER} уже использован с другим телом запроса'},
+                                status=status.HTTP_422_UNPROCESSABLE_ENTITY)
+            if record.status_code is not None:
+                return _replay(record)
+        else:
+            try:
+                with transaction.atomic():
+                    record = IdempotencyKey.objects.create(
+                        key=key,
+                        scope=scope,
+                        request_hash=request_hash,
+                        expires_at=now + timedelta(hours=settings.IDEMPOTENCY_KEY_TTL_HOURS)
+                    )
+            except IntegrityError:
+                # Параллельный запрос с тем же ключом успел раньше
+                return _in_progress()
+
+        # Действие и сохранение ответа - одна транзакция под блокировкой
+        # строки ключа. Пока запрос выполняется, строка заблокирована и повтор
+        # получает 409. Если воркер упал, транзакция откатилась вместе с
+        # действием, и повтор с тем же ключом может выполнить его заново.
+        locked = False
+        try:
+            with transaction.atomic():
+                record = IdempotencyKey.objects.select_for_update(nowait=True).get(pk=record.pk)
+                locked = True
+                if record.status_code is not None:
+                    # Другой запрос с этим ключом завершился раньше нас
+                    return _replay(record)
+                response = view_method(self, request, *args, **kwargs)
+                if response.status_code >= 500:
+                    transaction.set_rollback(True)
+                else:
+                    record.status_code = response.status_code
+                    record.response_body = response.data
+                    record.save(update_fields=['status_code', 'response_body'])
+        except IdempotencyKey.DoesNotExist:
+            # Ключ удален параллельным запросом, у которого действие упало
+            return _in_progress()
+        except DatabaseError:
+            if not locked:
+                # Строка заблокирована - запрос с этим ключом еще выполняется
+                return _in_progress()
+            _release(record)
+            raise
+        except Exception:
+            _release(record)
+            raise
+
+        if response.status_code >= 500:
+            _release(record)
+        return response
+
+    return wrapper
+
+
+def purge_expired_keys(chunk_size=1000):
+    """Удаляет истекшие ключи пачками. Возвращает количество удаленных."""
+    deleted = 0
+    while True:
+        ids = list(IdempotencyKey.objects.filter(
+            expires_at__lte=timezone.now()
+        ).values_list('id', flat=True)[:chunk_size])
+        if not ids:
+            return deleted
+        deleted += IdempotencyKey.objects.filter(id__in=ids).delete()[0]
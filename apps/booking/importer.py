@@ -0,0 +1,290 @@
+"""
+Пакетный импорт бронирований из внешних календарей (другие площадки,
+таблицы владельцев) в форматах JSON Lines и CSV.
+
+Весь пакет проверяется в памяти по заранее загруженным данным:
+объявления - одним запросом (с блокировкой строк, как при обычном создании),
+занятость - двумя запросами (BusySnapshot). Прошедшие проверку строки
+вставляются через bulk_create, их ночи блокируются одним upsert'ом.
+Результат - отдельный итог по каждой строке.
+"""
+import csv
+import json
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.exceptions import ValidationError
+from django.core.validators import validate_email
+from django.db import transaction
+from django.utils import timezone
+
+from apps.booking.availability import AvailabilityService, BusySnapshot
+from apps.booking.cache_versions import bump_version
+from apps.booking.enums import BookingStatus
+from apps.booking.models import Booking, Listing
+from apps.booking.models.booking import generate_booking_code
+from apps.booking.pricing import PricingService
+
+FORMATS = ('jsonl', 'csv')
+MAX_ROWS = 10000  # ограничение на один запрос к API
+BATCH_SIZE = 1000
+
+# Импортируются только бронирования, которые занимают или занимали даты
+IMPORT_STATUSES = BookingStatus.active() + [BookingStatus.COMPLETED.value]
+
+TEXT_FIELDS = {
+    'guest_first_name': 100,
+    'guest_last_name': 100,
+    'guest_phone': 20,
+    'guest_notes': None,
+    'special_requests': None,
+}
+REQUIRED_TEXT_FIELDS = ('guest_first_name', 'guest_last_name')
+
+
+class ImportFormatError(ValueError):
+    """Файл не удалось разобрать целиком"""
+
+
+def read_rows(lines, fmt):
+    """
+    Разбирает итерируемый источник строк текста в список словарей.
+    Строка JSON Lines, которую не удалось разобрать, превращается
+    в {'_error': ...} и попадает в результат как ошибка этой строки.
+    """
+    if fmt not in FORMATS:
+        raise ImportFormatError(f"Неизвестный формат: {fmt}")
+
+    if fmt == 'csv':
+        try:
+            return [dict(row) for row in csv.DictReader(lines)]
+        except csv.Error as e:
+            raise ImportFormatError(f"Ошибка CSV: {e}")
+
+    rows = []
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            row = json.loads(line)
+        except ValueError:
+            rows.append({'_error': "Некорректный JSON"})
+            continue
+        rows.append(row if isinstance(row, dict) else {'_error': "Ожидался JSON-объект"})
+    return rows
+
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value).strip())
+
+
+def _clean_row(raw):
+    """
+    Проверка строки без обращений к БД.
+    Возвращает (данные, ошибки) - ошибки в виде {поле: сообщение}.
+    """
+    if '_error' in raw:
+        return None, {'row': raw['_error']}
+
+    errors = {}
+    data = {}
+
+    listing_id = raw.get('listing_id', raw.get('listing'))
+    try:
+        data['listing_id'] = int(listing_id)
+    except (TypeError, ValueError):
+        errors['listing_id'] = "Необходимо указать id объявления"
+
+    for field in ('check_in_date', 'check_out_date'):
+        try:
+            data[field] = _parse_date(raw.get(field))
+        except (TypeError, ValueError):
+            errors[field] = "Формат даты: YYYY-MM-DD"
+    if not errors.keys() & {'check_in_date', 'check_out_date'}:
+        if data['check_out_date'] <= data['check_in_date']:
+            errors['check_out_date'] = "Дата выезда должна быть позже даты заезда"
+
+    guests = raw.get('number_of_guests') or 1
+    try:
+        data['number_of_guests'] = int(guests)
+        if not 1 <= data['number_of_guests'] <= 100:
+            raise ValueError
+    except (TypeError, ValueError):
+        errors['number_of_guests'] = "Количество гостей: от 1 до 100"
+
+    for field, max_length in TEXT_FIELDS.items():
+        value = raw.get(field)
+        value = '' if value is None else str(value).strip()
+        if max_length and len(value) > max_length:
+            errors[field] = f"Не более {max_length} символов"
+        data[field] = value
+    for field in REQUIRED_TEXT_FIELDS:
+        if not data[field]:
+            errors[field] = "Обязательное поле"
+
+    email = str(raw.get('guest_email') or '').strip()
+    if email:
+        try:
+            validate_email(email)
+        except ValidationError:
+            errors['guest_email'] = "Некорректный email"
+    data['guest_email'] = email
+
+    data['status'] = str(raw.get('status') or BookingStatus.CONFIRMED.value).strip()
+    if data['status'] not in IMPORT_STATUSES:
+        errors['status'] = f"Допустимые статусы: {', '.join(IMPORT_STATUSES)}"
+
+    price = raw.get('price')
+    data['price'] = None
+    if price not in (None, ''):
+        try:
+            data['price'] = Decimal(str(price))
+            if not data['price'].is_finite() or data['price'] <= 0:
+                raise InvalidOperation
+        except InvalidOperation:
+            errors['price'] = "Цена должна быть положительным числом"
+
+    return data, errors
+
+
+def _check_listing(data, listing):
+    """Ограничения объявления, которые проверяет Booking.clean()"""
+    nights = (data['check_out_date'] - data['check_in_date']).days
+    if listing.min_stay_days and nights < listing.min_stay_days:
+        return {'check_out_date': f"Минимальный срок проживания: {listing.min_stay_days} дней"}
+    if listing.max_stay_days and nights > listing.max_stay_days:
+        return {'check_out_date': f"Максимальный срок проживания: {listing.max_stay_days} дней"}
+    if data['number_of_guests'] > listing.max_guests:
+        return {'number_of_guests': f"Максимальное количество гостей: {listing.max_guests}"}
+    return {}
+
+
+def import_bookings(rows, lessor=None, dry_run=False, batch_size=BATCH_SIZE):
+    """
+    Импортирует список строк (словарей). lessor - ограничить импорт его
+    объявлениями (None - любые объявления, для администраторов).
+    dry_run - только проверка, без записи.
+    Возвращает список результатов в порядке строк:
+    {'row', 'success', 'booking_id', 'booking_code'} или {'row', 'success', 'errors'}.
+    """
+    results = [None] * len(rows)
+    cleaned = []
+    for number, raw in enumerate(rows):
+        data, errors = _clean_row(raw)
+        if errors:
+            results[number] = {'row': number + 1, 'success': False, 'errors': errors}
+        else:
+            cleaned.append((number, data))
+
+    with transaction.atomic():
+        # Блокируем строки объявлений, как BookingCreateSerializer.create,
+        # чтобы проверка занятости и вставка не пересекались с обычными бронированиями
+        listings = Listing.objects.select_for_update().filter(
+            id__in={data['listing_id'] for _, data in cleaned}
+        ).order_by('id').only('id', 'price', 'max_guests', 'min_stay_days', 'max_stay_days')
+        if lessor is not None:
+            listings = listings.filter(lessor=lessor)
+        listings = {listing.id: listing for listing in listings}
+
+        accepted = []
+        checked = []
+        for number, data in cleaned:
+            listing = listings.get(data['listing_id'])
+            errors = (
+                _check_listing(data, listing) if listing
+                else {'listing_id': "Объявление не найдено"}
+            )
+            if errors:
+                results[number] = {'row': number + 1, 'success': False, 'errors': errors}
+            else:
+                checked.append((number, data))
+
+        if checked:
+            snapshot = BusySnapshot(
+                {data['listing_id'] for _, data in checked},
+                min(data['check_in_date'] for _, data in checked),
+                max(data['check_out_date'] for _, data in checked)
+            )
+            for number, data in checked:
+                conflict = snapshot.conflict(
+                    data['listing_id'], data['check_in_date'], data['check_out_date']
+                )
+                if conflict:
+                    results[number] = {'row': number + 1, 'success': False,
+                                       'errors': {'dates': conflict}}
+                    continue
+                # Пересечения внутри самого пакета тоже считаются конфликтом
+                snapshot.add(data['listing_id'], data['check_in_date'], data['check_out_date'])
+                accepted.append((number, data))
+
+        if dry_run:
+            for number, _ in accepted:
+                results[number] = {'row': number + 1, 'success': True,
+                                   'booking_id': None, 'booking_code': None}
+            return results
+
+        # Строки без цены считаются по правилам цен объявления
+        tables = PricingService.rate_tables(
+            {listings[data['listing_id']] for _, data in accepted if data['price'] is None}
+        )
+        bookings = [
+            _build_booking(data, listings[data['listing_id']], tables.get(data['listing_id']))
+            for _, data in accepted
+        ]
+        Booking.objects.bulk_create(bookings, batch_size=batch_size)
+        if any(booking.pk is None for booking in bookings):
+            # MySQL не возвращает id из bulk INSERT - дочитываем по уникальному коду
+            ids = {}
+            codes = [booking.booking_code for booking in bookings]
+            for offset in range(0, len(codes), batch_size):
+                ids.update(Booking.objects.filter(
+                    booking_code__in=codes[offset:offset + batch_size]
+                ).values_list('booking_code', 'id'))
+            for booking in bookings:
+                booking.pk = ids[booking.booking_code]
+
+        AvailabilityService.block_many(
+            [(booking.listing_id, booking.check_in_date, booking.check_out_date, booking.pk)
+             for booking in bookings],
+            batch_size=batch_size
+        )
+
+    for listing_id in {booking.listing_id for booking in bookings}:
+        bump_version('bookings', listing_id)
+
+    for (number, _), booking in zip(accepted, bookings):
+        results[number] = {'row': number + 1, 'success': True,
+                           'booking_id': booking.pk, 'booking_code': booking.booking_code}
+    return results
+
+
+def _build_booking(data, listing, table=None):
+    """
+    Booking с полями, которые обычно рассчитывают сериализатор и Booking.save().
+    Без цены в строке - расчет PricingService по таблице цен; прошедшие даты
+    вне таблицы считаются по базовой цене объявления.
+    """
+    now = timezone.now()
+    fields = dict(data)
+    fields['total_nights'] = (data['check_out_date'] - data['check_in_date']).days
+    if fields['price'] is None and table and table.covers(data['check_in_date'], data['check_out_date']):
+        quote = PricingService.quote(
+            listing, data['check_in_date'], data['check_out_date'],
+            data['number_of_guests'], table=table
+        )
+        fields['price'] = (quote['base_price'] / fields['total_nights']).quantize(Decimal('0.01'))
+        fields['total_amount'] = quote['total']
+    else:
+        fields['price'] = fields['price'] or listing.price
+        fields['total_amount'] = PricingService.fixed_price_total(
+            fields['price'], fields['total_nights'], data['number_of_guests']
+        )
+    booking = Booking(booking_code=generate_booking_code(), **fields)
+    if booking.status != BookingStatus.PENDING.value:
+        booking.confirmed_at = now
+    if booking.status == BookingStatus.COMPLETED.value:
+        booking.completed_at = now
+    return booking
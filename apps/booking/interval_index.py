@@ -0,0 +1,109 @@
+"""
+Индекс интервалов активных бронирований объявления в памяти процесса.
+Отвечает на вопросы о пересечении, ближайшей свободной дате и свободных
+промежутках за O(log n). Устаревает по версии 'bookings' объявления
+(см. cache_versions) или через MAX_AGE_SECONDS после построения и тогда
+перестраивается одним запросом к БД. Срок жизни ограничивает устаревание
+после изменений в обход Booking.save/delete (.update(), массовое удаление).
+"""
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+
+from django.utils import timezone
+
+from apps.booking.cache_versions import get_version
+from apps.booking.enums import BookingStatus
+from apps.booking.models import Booking
+
+
+class BookingIntervalIndex:
+    MAX_CACHED_LISTINGS = 1024
+    MAX_AGE_SECONDS = 60
+
+    _cache = OrderedDict()
+    _lock = threading.Lock()
+
+    def __init__(self, intervals):
+        """intervals - итерируемое (check_in_date, check_out_date)"""
+        # Сливаем пересекающиеся/смежные интервалы в непересекающиеся блоки
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            if self.ends and start <= self.ends[-1]:
+                self.ends[-1] = max(self.ends[-1], end)
+            else:
+                self.starts.append(start)
+                self.ends.append(end)
+
+    def overlaps(self, check_in_date, check_out_date):
+        """Пересекает ли [check_in_date, check_out_date) занятый блок"""
+        position = bisect_left(self.starts, check_out_date)
+        return position > 0 and self.ends[position - 1] > check_in_date
+
+    def next_free_date(self, from_date):
+        """Первая свободная ночь начиная с from_date"""
+        position = bisect_right(self.starts, from_date)
+        if position > 0 and self.ends[position - 1] > from_date:
+            return self.ends[position - 1]
+        return from_date
+
+    def gaps(self, start_date, end_date):
+        """Свободные промежутки [start, end) внутри [start_date, end_date)"""
+        result = []
+        current = self.next_free_date(start_date)
+        position = bisect_right(self.starts, current)
+        while current < end_date:
+            block_start = self.starts[position] if position < len(self.starts) else end_date
+            gap_end = min(block_start, end_date)
+            if current < gap_end:
+                result.append((current, gap_end))
+            if position >= len(self.starts):
+                break
+            current = self.ends[position]
+            position += 1
+        return result
+
+    @classmethod
+    def from_db(cls, listing_id):
+        """Строит индекс по активным бронированиям объявления (один запрос)"""
+        return cls(
+            Booking.objects.filter(
+                listing_id=listing_id,
+                status__in=BookingStatus.active(),
+                is_deleted=False,
+                check_out_date__gt=timezone.now().date()
+            ).values_list('check_in_date', 'check_out_date')
+        )
+
+    @classmethod
+    def cached(cls, listing_id):
+        """Индекс из кеша процесса, если он актуален, иначе None (без запросов к БД)"""
+        version = get_version('bookings', listing_id)
+        with cls._lock:
+            cached = cls._cache.get(listing_id)
+            if (cached and cached[0] == version
+                    and time.monotonic() - cached[1] < cls.MAX_AGE_SECONDS):
+                cls._cache.move_to_end(listing_id)
+                return cached[2]
+        return None
+
+    @classmethod
+    def for_listing(cls, listing_id):
+        """
+        Актуальный индекс объявления из кеша процесса.
+        Если версия устарела - перестраивается из БД.
+        """
+        index = cls.cached(listing_id)
+        if index is not None:
+            return index
+
+        version = get_version('bookings', listing_id)
+        index = cls.from_db(listing_id)
+        with cls._lock:
+            cls._cache[listing_id] = (version, time.monotonic(), index)
+            cls._cache.move_to_end(listing_id)
+            while len(cls._cache) > cls.MAX_CACHED_LISTINGS:
+                cls._cache.popitem(last=False)
+        return index
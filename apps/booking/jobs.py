@@ -0,0 +1,290 @@
+"""
+Периодические задачи обслуживания календаря и бронирований.
+Запускаются management-командами (например, из cron раз в сутки).
+"""
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q
+from django.utils import timezone
+
+from apps.booking.availability import AvailabilityService
+from apps.booking.cache_versions import bump_version
+from apps.booking.enums import BookingStatus, Status
+from apps.booking.models import Booking, Calendar, CalendarMonthSummary, Listing
+from apps.booking.occupancy import calendar_month_totals
+
+
+def materialize_calendar(horizon_days=None, chunk_size=1000, full=False, today=None):
+    """
+    Создает записи Calendar для всех опубликованных объявлений
+    на скользящий горизонт [today, today + horizon_days).
+
+    По умолчанию для каждого объявления сравнивает число записей в его
+    диапазоне с числом дней: если записи идут без пропусков от начала
+    диапазона, достраивается только хвост после последней (ежедневный
+    запуск добавляет один день); если есть пропуски (например, записи
+    брони далеко в будущем) - заполняется весь диапазон. full=True
+    всегда заполняет весь диапазон. Вставка - bulk_create пачками
+    по chunk_size строк, существующие записи пропускаются по unique_together.
+
+    Возвращает (обработано объявлений, отправлено строк на вставку).
+    """
+    today = today or timezone.now().date()
+    horizon_days = horizon_days or settings.CALENDAR_HORIZON_DAYS
+    horizon_end = today + timedelta(days=horizon_days)
+
+    listings_processed = 0
+    rows_sent = 0
+    batch = []
+
+    listings = Listing.objects.filter(
+        status=Status.PUBLISHED.value
+    ).order_by('id').values_list('id', 'available_from', 'available_until')
+
+    last_id = 0
+    while True:
+        chunk = list(listings.filter(id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1][0]
+
+        existing = {}
+        if not full:
+            # Записи внутри диапазона каждого объявления: количество и последняя дата
+            existing = {
+                listing_id: (days, last)
+                for listing_id, days, last in Calendar.objects.filter(
+                    Q(listing__available_until__isnull=True) |
+                    Q(target_date__lte=F('listing__available_until')),
+                    listing_id__in=[listing_id for listing_id, _, _ in chunk],
+                    target_date__gte=today,
+                    target_date__lt=horizon_end,
+                ).filter(
+                    target_date__gte=F('listing__available_from')
+                ).values('listing_id').annotate(
+                    days=Count('id'), last=Max('target_date')
+                ).order_by().values_list('listing_id', 'days', 'last')
+            }
+
+        for listing_id, available_from, available_until in chunk:
+            listings_processed += 1
+            start = max(today, available_from)
+            end = horizon_end
+            if available_until:
+                end = min(end, available_until + timedelta(days=1))
+
+            if listing_id in existing:
+                days, last = existing[listing_id]
+                if days == (last - start).days + 1:
+                    # Без пропусков от начала диапазона - только хвост
+                    start = last + timedelta(days=1)
+
+            current = start
+            while current < end:
+                batch.append(Calendar(listing_id=listing_id, target_date=current, is_available=True))
+                current += timedelta(days=1)
+                if len(batch) >= chunk_size:
+                    Calendar.objects.bulk_create(batch, ignore_conflicts=True)
+                    rows_sent += len(batch)
+                    batch = []
+
+    if batch:
+        Calendar.objects.bulk_create(batch, ignore_conflicts=True)
+        rows_sent += len(batch)
+
+    return listings_processed, rows_sent
+
+
+def compact_calendar(before=None, chunk_size=100):
+    """
+    Сворачивает записи Calendar с target_date < before в помесячные итоги
+    CalendarMonthSummary и удаляет дневные записи.
+    По умолчанию before - первое число текущего месяца.
+
+    Работает пачками по chunk_size объявлений: на пачку одна транзакция
+    (агрегат, upsert итогов, удаление строк), поэтому память и размер
+    транзакции ограничены независимо от объема истории.
+
+    Возвращает (обновлено итогов, удалено дневных записей).
+    """
+    before = before or timezone.now().date().replace(day=1)
+    summaries_written = 0
+    rows_deleted = 0
+
+    listing_ids = Calendar.objects.filter(
+        target_date__lt=before,
+        listing__isnull=False
+    ).values_list('listing_id', flat=True).distinct().order_by('listing_id')
+
+    last_id = 0
+    while True:
+        chunk = list(listing_ids.filter(listing_id__gt=last_id)[:chunk_size])
+        if not chunk:
+            break
+        last_id = chunk[-1]
+
+        with transaction.atomic():
+            rows = Calendar.objects.filter(listing_id__in=chunk, target_date__lt=before)
+            totals = {
+                (row['listing_id'], row['month']): row
+                for row in calendar_month_totals(rows)
+            }
+            existing = {
+                (summary.listing_id, summary.month): summary
+                for summary in CalendarMonthSummary.objects.select_for_update().filter(
+                    listing_id__in=chunk,
+                    month__in={month for _, month in totals}
+                )
+            }
+
+            to_update = []
+            to_create = []
+            for key, row in totals.items():
+                summary = existing.get(key)
+                if summary is None:
+                    summary = CalendarMonthSummary(listing_id=key[0], month=key[1])
+                    to_create.append(summary)
+                else:
+                    to_update.append(summary)
+                summary.nights_total += row['nights_total']
+                summary.nights_booked += row['nights_booked']
+                summary.nights_sold += row['nights_sold']
+                summary.revenue += row['revenue'] or 0
+
+            CalendarMonthSummary.objects.bulk_create(to_create)
+            CalendarMonthSummary.objects.bulk_update(
+                to_update, ['nights_total', 'nights_booked', 'nights_sold', 'revenue', 'updated_at']
+            )
+            deleted, _ = rows.delete()
+
+        # Дневные записи удалены - кеши календаря, расчетов и аналитики устарели
+        for listing_id in {listing_id for listing_id, _ in totals}:
+            bump_version('calendar', listing_id)
+
+        summaries_written += len(totals)
+        rows_deleted += deleted
+
+    return summaries_written, rows_deleted
+
+
+def _update_in_chunks(queryset, chunk_size, **fields):
+    """
+    UPDATE строк queryset пачками по chunk_size первичных ключей.
+    Обновленные строки выпадают из выборки, поэтому следующая пачка
+    берется тем же запросом. UPDATE повторяет условия queryset - строки,
+    измененные параллельно, не затрагиваются. Возвращает число обновленных строк.
+    """
+    updated = 0
+    while True:
+        chunk = list(queryset.values_list('id', 'listing_id')[:chunk_size])
+        if not chunk:
+            return updated
+        updated += queryset.filter(id__in=[booking_id for booking_id, _ in chunk]).update(**fields)
+        for listing_id in {listing_id for _, listing_id in chunk}:
+            bump_version('bookings', listing_id)
+
+
+def advance_booking_statuses(today=None, chunk_size=1000):
+    """
+    Переводит бронирования по датам:
+    CONFIRMED -> ACTIVE в день заезда, CONFIRMED/ACTIVE -> COMPLETED в день
+    выезда (с заполнением completed_at). Пачки по chunk_size строк, каждая -
+    один SELECT id и один UPDATE, поэтому время и блокировки не растут
+    с размером таблицы.
+
+    Возвращает (заселено, завершено).
+    """
+    today = today or timezone.now().date()
+    now = timezone.now()
+    bookings = Booking.objects.filter(is_deleted=False).order_by()
+
+    # Сначала завершаем: бронирование, которое уже закончилось, не нужно делать активным
+    completed = _update_in_chunks(
+        bookings.filter(
+            status__in=[BookingStatus.CONFIRMED.value, BookingStatus.ACTIVE.value],
+            check_out_date__lte=today
+        ),
+        chunk_size,
+        status=BookingStatus.COMPLETED.value,
+        completed_at=now,
+        updated_at=now
+    )
+    activated = _update_in_chunks(
+        bookings.filter(
+            status=BookingStatus.CONFIRMED.value,
+            check_in_date__lte=today,
+            check_out_date__gt=today
+        ),
+        chunk_size,
+        status=BookingStatus.ACTIVE.value,
+        updated_at=now
+    )
+    return activated, completed
+
+
+EXPIRED_REASON = "Истек срок подтверждения владельцем"
+
+
+def expire_pending_bookings(ttl_hours=None, batch_size=500, max_batches=None, max_seconds=None):
+    """
+    Отменяет бронирования, которые висят в PENDING дольше ttl_hours
+    (по умолчанию PENDING_BOOKING_TTL_HOURS) или чья дата заезда уже наступила,
+    и освобождает их ночи.
+
+    Пачка из batch_size строк - одна транзакция: SELECT ... FOR UPDATE SKIP LOCKED,
+    один UPDATE статуса и один UPDATE календаря по id бронирований пачки.
+    max_batches и max_seconds ограничивают один запуск при большом долге -
+    остаток обработает следующий запуск.
+
+    Возвращает (отменено бронирований, освобождено ночей, весь ли долг разобран).
+    """
+    ttl_hours = settings.PENDING_BOOKING_TTL_HOURS if ttl_hours is None else ttl_hours
+    now = timezone.now()
+    deadline = time.monotonic() + max_seconds if max_seconds else None
+
+    pending = Booking.objects.filter(
+        status=BookingStatus.PENDING.value, is_deleted=False
+    ).order_by()
+    # Два условия - два прохода, чтобы каждый шел по своему индексу
+    stale_querysets = [
+        pending.filter(created_at__lt=now - timedelta(hours=ttl_hours)),
+        pending.filter(check_in_date__lte=now.date()),
+    ]
+
+    expired = 0
+    released = 0
+    batches = 0
+    for stale in stale_querysets:
+        while True:
+            if max_batches is not None and batches >= max_batches:
+                return expired, released, False
+            if deadline is not None and time.monotonic() >= deadline:
+                return expired, released, False
+
+            with transaction.atomic():
+                rows = list(
+                    stale.select_for_update(skip_locked=True).values_list(
+                        'id', 'listing_id', 'check_in_date', 'check_out_date'
+                    )[:batch_size]
+                )
+                if not rows:
+                    break
+                expired += Booking.objects.filter(id__in=[row[0] for row in rows]).update(
+                    status=BookingStatus.CANCELLED.value,
+                    cancelled_at=now,
+                    cancellation_reason=EXPIRED_REASON,
+                    updated_at=now
+                )
+                released += AvailabilityService.free_many(
+                    [(listing_id, check_in, check_out, booking_id)
+                     for booking_id, listing_id, check_in, check_out in rows],
+                    batch_size=batch_size
+                )
+            batches += 1
+            for listing_id in {row[1] for row in rows}:
+                bump_version('bookings', listing_id)
+
+    return expired, released, True
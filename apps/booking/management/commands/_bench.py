@@ -0,0 +1,100 @@
+"""Общие помощники для команд-бенчмарков (bench_*)."""
+import time
+from abc import ABCMeta, abstractmethod
+import uuid
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from apps.booking.enums import Role, Status
+from apps.booking.models import Address, Listing, User
+
+
+class Rollback(Exception):
+    """Откат транзакции с тестовыми данными бенчмарка"""
+
+
+def measure(func, repeat=20):
+    """
+    Выполняет func() repeat раз.
+    Возвращает (запросов за вызов, среднее время вызова в мс).
+    """
+    with CaptureQueriesContext(connection) as ctx:
+        func()
+    queries = len(ctx.captured_queries)
+
+    started = time.perf_counter()
+    for _ in range(repeat):
+        func()
+    elapsed_ms = (time.perf_counter() - started) * 1000 / repeat
+
+    return queries, elapsed_ms
+
+
+def make_lessor():
+    suffix = uuid.uuid4().hex[:8]
+    return User.objects.create(
+        username=f"bench_{suffix}",
+        email=f"bench_{suffix}@example.com",
+        first_name="Bench",
+        last_name="Lessor",
+        role=Role.LESSOR.value,
+    )
+
+
+def make_listing(lessor=None, **extra):
+    lessor = lessor or make_lessor()
+    address = Address.objects.create(
+        address="Benchstraße 1",
+        city="Berlin",
+        state="Berlin",
+        postal_code="10115",
+    )
+    fields = {
+        'title': "Bench listing",
+        'description': "Bench",
+        'address': address,
+        'price': 100,
+        'lessor': lessor,
+        'rooms': 1,
+        'bedrooms': 1,
+        'bathrooms': 1,
+        'area_sqm': 30,
+        'max_guests': 4,
+        'available_from': timezone.now().date() - timedelta(days=1),
+        'status': Status.PUBLISHED.value,
+    }
+    fields.update(extra)
+    return Listing.objects.create(**fields)
+
+
+class BenchmarkCommand(BaseCommand, metaclass=ABCMeta):
+    """
+    Базовая команда бенчмарка: все тестовые данные создаются
+    внутри транзакции, которая в конце откатывается.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=20, help="Повторов на замер")
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(**options)
+                raise Rollback
+        except Rollback:
+            pass
+
+    @abstractmethod
+    def run(self, **options):
+        """Замеры команды; вызывается внутри откатываемой транзакции"""
+
+    def report(self, label, queries, elapsed_ms):
+        self.stdout.write(f"{label:<40} {queries:>8} {elapsed_ms:>10.3f}")
+
+    def header(self, title):
+        self.stdout.write(self.style.MIGRATE_HEADING(title))
+        self.stdout.write(f"{'':<40} {'запросов':>8} {'мс/вызов':>10}")
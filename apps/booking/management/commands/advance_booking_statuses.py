@@ -0,0 +1,29 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.booking.jobs import advance_booking_statuses
+
+
+class Command(BaseCommand):
+    help = (
+        "Переводит бронирования по датам: confirmed -> active в день заезда, "
+        "-> completed в день выезда. Рассчитано на запуск из cron (например, раз в час)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--date', help="Считать сегодняшней эту дату, YYYY-MM-DD")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Бронирований на один UPDATE")
+
+    def handle(self, *args, date, chunk_size, **options):
+        if date:
+            try:
+                date = datetime.strptime(date, '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Формат --date: YYYY-MM-DD")
+
+        activated, completed = advance_booking_statuses(today=date, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Заселено (active): {activated}, завершено (completed): {completed}"
+        ))
@@ -0,0 +1,44 @@
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.booking.availability import AvailabilityService
+from apps.booking.models import Calendar
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+
+def legacy_check_availability(listing, check_in_date, check_out_date):
+    """Прежняя реализация: один SELECT (и INSERT при отсутствии записи) на ночь"""
+    current_date = check_in_date
+    while current_date < check_out_date:
+        try:
+            entry = Calendar.objects.get(listing=listing, target_date=current_date)
+            if not entry.is_available:
+                return False
+        except Calendar.DoesNotExist:
+            Calendar.objects.create(listing=listing, target_date=current_date, is_available=True)
+        current_date += timedelta(days=1)
+    return True
+
+
+class Command(BenchmarkCommand):
+    help = "Количество запросов и время проверки доступности для 1, 30 и 365 ночей"
+
+    def run(self, repeat, **options):
+        check_in = timezone.now().date() + timedelta(days=1)
+
+        self.header("AvailabilityService.check_availability")
+        for nights in (1, 30, 365):
+            listing = make_listing()
+            check_out = check_in + timedelta(days=nights)
+
+            # Пустой календарь: прежняя версия создавала записи на первом проходе
+            queries, elapsed = measure(
+                lambda: legacy_check_availability(listing, check_in, check_out), repeat
+            )
+            self.report(f"до:    {nights} ноч.", queries, elapsed)
+
+            queries, elapsed = measure(
+                lambda: AvailabilityService.check_availability(listing, check_in, check_out), repeat
+            )
+            self.report(f"после: {nights} ноч.", queries, elapsed)
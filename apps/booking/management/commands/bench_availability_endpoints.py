@@ -0,0 +1,113 @@
+import itertools
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.booking.availability import AvailabilityService
+from apps.booking.enums import BookingStatus, Role
+from apps.booking.models import Booking, User
+from apps.booking.serializers import BookingCreateSerializer
+from apps.booking.views.bookings import BookingViewSet
+from apps.booking.views.calendars import CalendarViewSet
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Запросов на проверку доступности для каждой точки входа и "
+        "согласованность их ответов на сетке диапазонов"
+    )
+
+    def run(self, repeat, **options):
+        factory = APIRequestFactory()
+        today = timezone.now().date()
+        listing = make_listing()
+        suffix = uuid.uuid4().hex[:8]
+        lessee = User.objects.create(
+            username=f"bench_lessee_{suffix}",
+            email=f"bench_lessee_{suffix}@example.com",
+            first_name="Bench",
+            last_name="Lessee",
+            phone="+4900000000",
+            role=Role.LESSEE.value,
+        )
+
+        # Бронирование с заблокированным календарем
+        blocked = Booking.objects.create(
+            listing=listing, lessee=lessee,
+            check_in_date=today + timedelta(days=5),
+            check_out_date=today + timedelta(days=8),
+            status=BookingStatus.CONFIRMED.value,
+        )
+        AvailabilityService.block_dates(listing, blocked.check_in_date, blocked.check_out_date, blocked)
+        # Бронирование без записей в календаре (расхождение данных)
+        Booking.objects.create(
+            listing=listing, lessee=lessee,
+            check_in_date=today + timedelta(days=12),
+            check_out_date=today + timedelta(days=14),
+            status=BookingStatus.PENDING.value,
+        )
+        # Закрытый владельцем день без бронирования
+        AvailabilityService.block_dates(listing, today + timedelta(days=18), today + timedelta(days=19), None)
+
+        booking_view = BookingViewSet.as_view({'get': 'check_availability'})
+        calendar_view = CalendarViewSet.as_view({'post': 'check_availability'})
+
+        def via_bookings(check_in, check_out):
+            request = factory.get('/', {
+                'listing_id': listing.pk,
+                'check_in_date': check_in.isoformat(),
+                'check_out_date': check_out.isoformat(),
+            })
+            return booking_view(request).data['is_available']
+
+        def via_calendars(check_in, check_out):
+            request = factory.post('/', {
+                'listing_id': listing.pk,
+                'check_in_date': check_in.isoformat(),
+                'check_out_date': check_out.isoformat(),
+            }, format='json')
+            force_authenticate(request, user=lessee)
+            return calendar_view(request).data['is_available']
+
+        def via_create(check_in, check_out):
+            request = factory.post('/')
+            force_authenticate(request, user=lessee)
+            request.user = lessee
+            serializer = BookingCreateSerializer(
+                data={
+                    'listing': listing.pk,
+                    'check_in_date': check_in.isoformat(),
+                    'check_out_date': check_out.isoformat(),
+                },
+                context={'request': request}
+            )
+            return serializer.is_valid() or 'dates' not in serializer.errors
+
+        entry_points = [
+            ("GET /bookings/availability/check/", via_bookings),
+            ("POST /calendars/check_availability/", via_calendars),
+            ("BookingCreateSerializer.validate", via_create),
+        ]
+
+        check_in = today + timedelta(days=1)
+        check_out = today + timedelta(days=30)
+        self.header("Запросов на одну проверку (30 ночей)")
+        for label, func in entry_points:
+            self.report(label, *measure(lambda: func(check_in, check_out), repeat))
+
+        mismatches = 0
+        checked = 0
+        for start, length in itertools.product(range(1, 22), (1, 2, 3, 7)):
+            check_in = today + timedelta(days=start)
+            check_out = check_in + timedelta(days=length)
+            answers = [func(check_in, check_out) for _, func in entry_points]
+            checked += 1
+            if len(set(answers)) != 1:
+                mismatches += 1
+                self.stdout.write(self.style.ERROR(f"{check_in} - {check_out}: {answers}"))
+
+        style = self.style.SUCCESS if not mismatches else self.style.ERROR
+        self.stdout.write(style(f"Согласованность: {checked} диапазонов, расхождений: {mismatches}"))
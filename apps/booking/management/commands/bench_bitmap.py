@@ -0,0 +1,78 @@
+import sys
+from datetime import date, timedelta
+
+from apps.booking.bitmap import YEAR_BYTES, BitmapService, YearBitmap, day_index
+from apps.booking.models import Calendar
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+
+def deep_sizeof(instance):
+    """Приблизительный размер загруженной модели в памяти"""
+    return sys.getsizeof(instance) + sys.getsizeof(instance.__dict__) + sum(
+        sys.getsizeof(value) for value in instance.__dict__.values()
+    )
+
+
+class Command(BenchmarkCommand):
+    help = "Сравнение битовой карты занятости с записями Calendar: память и время"
+
+    def run(self, repeat, **options):
+        year = date.today().year + 1
+        listing = make_listing()
+        first_day = date(year, 1, 1)
+        days = [first_day + timedelta(days=offset) for offset in range(365)]
+
+        # Каждая третья неделя занята
+        Calendar.objects.bulk_create([
+            Calendar(listing=listing, target_date=day, is_available=(day.isocalendar()[1] % 3 != 0))
+            for day in days
+        ])
+        BitmapService.rebuild([listing.pk])
+
+        rows = list(Calendar.objects.filter(listing=listing))
+        rows_size = sum(deep_sizeof(row) for row in rows)
+        bitmap = BitmapService.load(listing.pk, [year])[year]
+
+        self.stdout.write(self.style.MIGRATE_HEADING("Память на объявление-год"))
+        self.stdout.write(f"Calendar: {len(rows)} записей, ~{rows_size} байт в памяти")
+        self.stdout.write(f"Битовая карта: {YEAR_BYTES} байт в БД, "
+                          f"{sys.getsizeof(bitmap.value)} байт в памяти")
+
+        check_in = date(year, 3, 1)
+        check_out = date(year, 4, 1)
+        month_start = date(year, 6, 1)
+        month_end = date(year, 7, 1)
+
+        self.header("Проверка диапазона 31 ночь")
+        self.report("Calendar: exists()", *measure(
+            lambda: Calendar.objects.filter(
+                listing=listing,
+                target_date__gte=check_in,
+                target_date__lt=check_out,
+                is_available=False
+            ).exists(), repeat
+        ))
+        self.report("Битовая карта: загрузка + маска", *measure(
+            lambda: BitmapService.is_range_free(listing.pk, check_in, check_out), repeat
+        ))
+        self.report("Битовая карта: только маска", *measure(
+            lambda: bitmap.is_free(day_index(check_in), day_index(check_out)), repeat * 100
+        ))
+
+        self.header("Свободных ночей в месяце")
+        self.report("Calendar: count()", *measure(
+            lambda: Calendar.objects.filter(
+                listing=listing,
+                target_date__gte=month_start,
+                target_date__lt=month_end,
+                is_available=True
+            ).count(), repeat
+        ))
+        self.report("Битовая карта: загрузка + popcount", *measure(
+            lambda: BitmapService.free_nights_in_month(listing.pk, year, 6), repeat
+        ))
+
+        other = YearBitmap(year)
+        other.set_busy(day_index(check_in), day_index(check_out))
+        self.header("Пересечение двух годовых карт")
+        self.report("Битовая карта: AND", *measure(lambda: bitmap.overlaps(other), repeat * 100))
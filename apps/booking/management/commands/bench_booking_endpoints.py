@@ -0,0 +1,94 @@
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.booking.availability import AvailabilityService
+from apps.booking.enums import BookingStatus, Role
+from apps.booking.models import Booking, User
+from apps.booking.views.bookings import BookingViewSet
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+# Статус и сдвиг дат так, чтобы каждое бронирование попало в свой список
+STATES = [
+    (BookingStatus.PENDING.value, 10),
+    (BookingStatus.CONFIRMED.value, 10),
+    (BookingStatus.COMPLETED.value, -30),
+    (BookingStatus.CANCELLED.value, 10),
+]
+
+
+class Command(BenchmarkCommand):
+    help = (
+        "Запросов на список и карточку бронирований (list, retrieve, active, "
+        "completed, cancelled) при разном числе строк. Число запросов "
+        "не должно расти вместе с числом бронирований."
+    )
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10, 100],
+                            help="Бронирований каждого статуса")
+
+    def run(self, repeat, sizes, **options):
+        factory = APIRequestFactory()
+        today = timezone.now().date()
+        listing = make_listing()
+        suffix = uuid.uuid4().hex[:8]
+        lessee = User.objects.create(
+            username=f"bench_lessee_{suffix}",
+            email=f"bench_lessee_{suffix}@example.com",
+            first_name="Bench",
+            last_name="Lessee",
+            phone="+4900000000",
+            role=Role.LESSEE.value,
+        )
+
+        def call(action, user, pk=None):
+            view = BookingViewSet.as_view({'get': action})
+            request = factory.get('/')
+            force_authenticate(request, user=user)
+            response = view(request, pk=pk) if pk else view(request)
+            assert response.status_code == 200, response.data
+            return response
+
+        created = 0
+        counts = {}
+        for size in sorted(sizes):
+            # Достраиваем данные до size бронирований каждого статуса
+            for status, offset in STATES:
+                for index in range(created, size):
+                    check_in = today + timedelta(days=offset + index * 3)
+                    booking = Booking(
+                        listing=listing, lessee=lessee, status=status,
+                        check_in_date=check_in, check_out_date=check_in + timedelta(days=2),
+                    )
+                    booking.save(validate=False)
+                    if status != BookingStatus.CANCELLED.value:
+                        AvailabilityService.block_dates(
+                            listing, booking.check_in_date, booking.check_out_date, booking
+                        )
+            created = size
+            any_booking = Booking.objects.filter(listing=listing).first()
+
+            self.header(f"{size} бронирований каждого статуса")
+            for label, action, user, pk in [
+                ("list (арендатор)", 'list', lessee, None),
+                ("list (владелец)", 'list', listing.lessor, None),
+                ("retrieve", 'retrieve', lessee, any_booking.pk),
+                ("active", 'active', lessee, None),
+                ("completed", 'completed', lessee, None),
+                ("cancelled", 'cancelled', lessee, None),
+            ]:
+                queries, elapsed_ms = measure(lambda: call(action, user, pk), repeat)
+                counts.setdefault(label, []).append(queries)
+                self.report(label, queries, elapsed_ms)
+
+        growing = [label for label, values in counts.items() if len(set(values)) > 1]
+        if growing:
+            self.stdout.write(self.style.ERROR(
+                f"Число запросов растет с числом строк: {', '.join(growing)}"
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS("Число запросов не зависит от числа строк"))
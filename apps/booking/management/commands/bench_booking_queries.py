@@ -0,0 +1,66 @@
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from apps.booking.enums import BookingStatus, Role
+from apps.booking.models import Booking, User
+from apps.booking.serializers import BookingCreateSerializer
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+
+class Command(BenchmarkCommand):
+    help = "Количество запросов на создание бронирования и переходы статусов"
+
+    def run(self, repeat, **options):
+        listing = make_listing()
+        suffix = uuid.uuid4().hex[:8]
+        lessee = User.objects.create(
+            username=f"bench_lessee_{suffix}",
+            email=f"bench_lessee_{suffix}@example.com",
+            first_name="Bench",
+            last_name="Lessee",
+            phone="+4900000000",
+            role=Role.LESSEE.value,
+        )
+        request = APIRequestFactory().post('/')
+        request.user = lessee
+        start = timezone.now().date() + timedelta(days=3)
+        offsets = iter(range(0, 10 ** 6, 3))
+
+        def create():
+            check_in = start + timedelta(days=next(offsets))
+            serializer = BookingCreateSerializer(
+                data={
+                    'listing': listing.pk,
+                    'check_in_date': check_in.isoformat(),
+                    'check_out_date': (check_in + timedelta(days=3)).isoformat(),
+                },
+                context={'request': request}
+            )
+            serializer.is_valid(raise_exception=True)
+            return serializer.save()
+
+        def fresh():
+            return Booking.objects.get(pk=create().pk)
+
+        self.header("Бронирование")
+        self.report("validate() + create()", *measure(create, repeat))
+
+        def full_save():
+            booking = fresh()
+            booking.status = BookingStatus.CONFIRMED.value
+            return lambda: booking.save()
+
+        def transition(method, *args):
+            booking = fresh()
+            return lambda: getattr(booking, method)(*args)
+
+        for label, prepare in [
+            ("save() с full_clean (прежний путь)", full_save),
+            ("mark_as_confirmed()", lambda: transition('mark_as_confirmed')),
+            ("mark_as_cancelled()", lambda: transition('mark_as_cancelled', lessee, "bench")),
+            ("mark_as_completed()", lambda: transition('mark_as_completed')),
+        ]:
+            self.report(label, *measure(prepare(), repeat))
@@ -0,0 +1,65 @@
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+
+from apps.booking.enums import BookingStatus
+from apps.booking.interval_index import BookingIntervalIndex
+from apps.booking.models import Booking
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+
+class Command(BenchmarkCommand):
+    help = "Проверка пересечения бронирований: ORM-запрос против индекса интервалов"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--bookings', type=int, default=200, help="Бронирований у объявления")
+
+    def run(self, repeat, bookings, **options):
+        listing = make_listing()
+        today = timezone.now().date()
+
+        # Бронирования по 3 ночи через день
+        Booking.objects.bulk_create([
+            Booking(
+                listing=listing,
+                check_in_date=today + timedelta(days=offset * 4),
+                check_out_date=today + timedelta(days=offset * 4 + 3),
+                total_nights=3,
+                price=listing.price,
+                total_amount=listing.price * 3,
+                guest_first_name="Bench",
+                guest_last_name="Guest",
+                status=BookingStatus.CONFIRMED.value,
+                booking_code=str(uuid.uuid4()),
+            )
+            for offset in range(bookings)
+        ])
+
+        # Свободная ночь в середине - худший случай для обоих вариантов
+        check_in = today + timedelta(days=bookings * 2 + 3)
+        check_out = check_in + timedelta(days=1)
+
+        def orm_check():
+            return Booking.objects.filter(
+                listing=listing,
+                check_in_date__lt=check_out,
+                check_out_date__gt=check_in,
+                status__in=BookingStatus.active()
+            ).exists()
+
+        self.header(f"Пересечение, {bookings} бронирований")
+        self.report("ORM exists()", *measure(orm_check, repeat))
+        self.report("Индекс: построение из БД", *measure(
+            lambda: BookingIntervalIndex.from_db(listing.pk), repeat
+        ))
+        BookingIntervalIndex.for_listing(listing.pk)
+        self.report("Индекс: overlaps() из кеша", *measure(
+            lambda: BookingIntervalIndex.for_listing(listing.pk).overlaps(check_in, check_out),
+            repeat * 100
+        ))
+        index = BookingIntervalIndex.for_listing(listing.pk)
+        self.report("Индекс: next_free_date()", *measure(
+            lambda: index.next_free_date(today), repeat * 100
+        ))
@@ -0,0 +1,77 @@
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from apps.booking.enums import BookingStatus, Role
+from apps.booking.models import Booking, User
+from apps.booking.pagination import KeysetPagination
+from apps.booking.views.bookings import BookingViewSet
+from apps.booking.management.commands._bench import BenchmarkCommand, make_listing, measure
+
+
+class Command(BenchmarkCommand):
+    help = "Время выборки страницы на разной глубине: keyset-курсор против OFFSET"
+
+    def add_arguments(self, parser):
+        super().add_arguments(parser)
+        parser.add_argument('--rows', type=int, default=20000, help="Бронирований в выборке")
+        parser.add_argument('--page-size', type=int, default=50)
+
+    def run(self, repeat, rows, page_size, **options):
+        listing = make_listing()
+        suffix = uuid.uuid4().hex[:8]
+        lessee = User.objects.create(
+            username=f"bench_lessee_{suffix}",
+            email=f"bench_lessee_{suffix}@example.com",
+            role=Role.LESSEE.value,
+        )
+        today = timezone.now().date()
+        Booking.objects.bulk_create(
+            [
+                Booking(
+                    listing=listing, lessee=lessee,
+                    check_in_date=today + timedelta(days=index % 700),
+                    check_out_date=today + timedelta(days=index % 700 + 2),
+                    status=BookingStatus.COMPLETED.value,
+                    booking_code=str(uuid.uuid4()),
+                    total_nights=2, total_amount=200,
+                    guest_first_name="Bench", guest_last_name="Guest",
+                )
+                for index in range(rows)
+            ],
+            batch_size=1000
+        )
+
+        factory = APIRequestFactory()
+        view = BookingViewSet(action='list', format_kwarg=None)
+        queryset = Booking.objects.filter(lessee=lessee)
+
+        for ordering in ['-created_at', 'check_in_date']:
+            field = ordering.lstrip('-')
+            prefix = '-' if ordering.startswith('-') else ''
+            ordered = queryset.order_by(f'{prefix}{field}', f'{prefix}id')
+
+            self.header(f"Сортировка {ordering}, id ({rows} строк, страница {page_size})")
+            for offset in [0, rows // 2, rows - page_size]:
+                def by_offset():
+                    return list(ordered[offset:offset + page_size])
+
+                params = {'ordering': ordering, 'page_size': page_size, 'count': 'false'}
+                if offset:
+                    # Курсор указывает на строку перед нужной страницей
+                    previous = ordered[offset - 1]
+                    params['cursor'] = KeysetPagination().encode_cursor(
+                        getattr(previous, field), previous.pk, False
+                    )
+                request = Request(factory.get('/', params))
+                view.request = request
+
+                def by_keyset():
+                    return KeysetPagination().paginate_queryset(queryset, request, view)
+
+                assert [b.pk for b in by_offset()] == [b.pk for b in by_keyset()]
+                self.report(f"OFFSET {offset}", *measure(by_offset, repeat))
+                self.report(f"keyset на глубине {offset}", *measure(by_keyset, repeat))
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.booking.jobs import compact_calendar
+
+
+class Command(BaseCommand):
+    help = (
+        "Сворачивает прошедшие дни календаря в помесячные итоги "
+        "(CalendarMonthSummary) и удаляет дневные записи"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--before', help="Сжимать дни до этой даты, YYYY-MM-DD "
+                                             "(по умолчанию - начало текущего месяца)")
+        parser.add_argument('--chunk-size', type=int, default=100,
+                            help="Объявлений на одну транзакцию")
+
+    def handle(self, *args, before, chunk_size, **options):
+        if before:
+            try:
+                before = datetime.strptime(before, '%Y-%m-%d').date()
+            except ValueError:
+                raise CommandError("Формат --before: YYYY-MM-DD")
+
+        summaries, deleted = compact_calendar(before=before, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(
+            f"Итогов обновлено: {summaries}, дневных записей удалено: {deleted}"
+        ))
@@ -0,0 +1,32 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.booking.jobs import expire_pending_bookings
+
+
+class Command(BaseCommand):
+    help = (
+        "Отменяет неподтвержденные (pending) бронирования старше PENDING_BOOKING_TTL_HOURS "
+        "или с наступившей датой заезда и освобождает их даты. Рассчитано на запуск из cron."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--ttl-hours', type=int, default=settings.PENDING_BOOKING_TTL_HOURS,
+                            help="Через сколько часов pending истекает")
+        parser.add_argument('--batch-size', type=int, default=500,
+                            help="Бронирований на одну транзакцию")
+        parser.add_argument('--max-batches', type=int, help="Не больше пачек за запуск")
+        parser.add_argument('--max-seconds', type=float, help="Не дольше секунд за запуск")
+
+    def handle(self, *args, ttl_hours, batch_size, max_batches, max_seconds, **options):
+        expired, released, finished = expire_pending_bookings(
+            ttl_hours=ttl_hours,
+            batch_size=batch_size,
+            max_batches=max_batches,
+            max_seconds=max_seconds
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Истекло бронирований: {expired}, освобождено ночей: {released}"
+        ))
+        if not finished:
+            self.stdout.write("Достигнут лимит запуска, остаток будет обработан следующим запуском")
@@ -0,0 +1,58 @@
+import sys
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.booking.exports import CHUNK_SIZE, FORMATS, export_lines, export_queryset
+from apps.booking.models import User
+
+
+class Command(BaseCommand):
+    help = "Потоковая выгрузка бронирований в CSV или JSON Lines (память не растет с объемом)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл .csv/.jsonl, '-' - stdout")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Формат (по умолчанию - по расширению файла)")
+        parser.add_argument('--lessor', help="Имя владельца: только бронирования его объявлений")
+        parser.add_argument('--status', help="Только бронирования в этом статусе")
+        parser.add_argument('--listing', type=int, help="id объявления")
+        parser.add_argument('--check-in-from', type=date.fromisoformat, help="Заезд с даты (YYYY-MM-DD)")
+        parser.add_argument('--check-in-to', type=date.fromisoformat, help="Заезд до даты, не включая")
+        parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                            help="Строк на одну порцию чтения из БД")
+
+    def handle(self, *args, path, format, lessor, status, listing, check_in_from, check_in_to,
+               chunk_size, **options):
+        fmt = format or path.rsplit('.', 1)[-1].lower()
+        if fmt == 'ndjson':
+            fmt = 'jsonl'
+        if fmt not in FORMATS:
+            raise CommandError("Укажите --format csv или jsonl")
+
+        if lessor:
+            try:
+                lessor = User.objects.get(username=lessor)
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {lessor} не найден")
+
+        queryset = export_queryset(
+            lessor=lessor or None,
+            status=status,
+            listing_id=listing,
+            check_in_from=check_in_from,
+            check_in_to=check_in_to
+        )
+
+        try:
+            if path == '-':
+                for part in export_lines(queryset, fmt, chunk_size):
+                    sys.stdout.write(part)
+                return
+            with open(path, 'w', encoding='utf-8', newline='') as target:
+                for part in export_lines(queryset, fmt, chunk_size):
+                    target.write(part)
+        except OSError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(f"Выгрузка записана в {path}"))
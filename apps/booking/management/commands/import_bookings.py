@@ -0,0 +1,58 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.booking.importer import BATCH_SIZE, FORMATS, ImportFormatError, import_bookings, read_rows
+from apps.booking.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Пакетный импорт бронирований из JSON Lines или CSV "
+        "(выгрузки других площадок, таблицы владельцев)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help="Файл .jsonl/.csv, '-' - stdin")
+        parser.add_argument('--format', choices=FORMATS,
+                            help="Формат (по умолчанию - по расширению файла)")
+        parser.add_argument('--lessor', help="Имя владельца: импортировать только в его объявления")
+        parser.add_argument('--dry-run', action='store_true', help="Только проверка, без записи")
+        parser.add_argument('--batch-size', type=int, default=BATCH_SIZE,
+                            help="Строк на один INSERT")
+        parser.add_argument('--show-errors', type=int, default=20,
+                            help="Сколько ошибок вывести")
+
+    def handle(self, *args, path, format, lessor, dry_run, batch_size, show_errors, **options):
+        fmt = format or path.rsplit('.', 1)[-1].lower()
+        if fmt == 'ndjson':
+            fmt = 'jsonl'
+        if fmt not in FORMATS:
+            raise CommandError("Укажите --format jsonl или csv")
+
+        if lessor:
+            try:
+                lessor = User.objects.get(username=lessor)
+            except User.DoesNotExist:
+                raise CommandError(f"Пользователь {lessor} не найден")
+
+        try:
+            if path == '-':
+                rows = read_rows(sys.stdin, fmt)
+            else:
+                with open(path, encoding='utf-8-sig', newline='') as source:
+                    rows = read_rows(source, fmt)
+        except (OSError, ImportFormatError) as e:
+            raise CommandError(str(e))
+
+        results = import_bookings(rows, lessor=lessor or None, dry_run=dry_run, batch_size=batch_size)
+
+        failed = [result for result in results if not result['success']]
+        for result in failed[:show_errors]:
+            errors = '; '.join(f"{field}: {message}" for field, message in result['errors'].items())
+            self.stderr.write(f"Строка {result['row']}: {errors}")
+
+        verb = "Прошло проверку" if dry_run else "Импортировано"
+        self.stdout.write(self.style.SUCCESS(
+            f"{verb}: {len(results) - len(failed)}, с ошибками: {len(failed)}"
+        ))
@@ -0,0 +1,29 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from apps.booking.jobs import materialize_calendar
+
+
+class Command(BaseCommand):
+    help = (
+        "Создает записи календаря опубликованных объявлений на скользящий горизонт. "
+        "Рассчитано на ежедневный запуск (cron): каждый запуск достраивает горизонт."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horizon-days', type=int, default=settings.CALENDAR_HORIZON_DAYS,
+                            help="Горизонт в днях от сегодня")
+        parser.add_argument('--chunk-size', type=int, default=1000,
+                            help="Размер пачки объявлений и строк для bulk insert")
+        parser.add_argument('--full', action='store_true',
+                            help="Заполнять весь горизонт, не проверяя, есть ли пропуски")
+
+    def handle(self, *args, horizon_days, chunk_size, full, **options):
+        listings, rows = materialize_calendar(
+            horizon_days=horizon_days,
+            chunk_size=chunk_size,
+            full=full
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f"Объявлений: {listings}, строк отправлено на вставку: {rows}"
+        ))
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.booking.idempotency import purge_expired_keys
+
+
+class Command(BaseCommand):
+    help = "Удаляет истекшие ключи идемпотентности (запускать периодически, например из cron)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--chunk-size', type=int, default=1000)
+
+    def handle(self, *args, chunk_size, **options):
+        deleted = purge_expired_keys(chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Удалено ключей: {deleted}"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.booking.bitmap import BitmapService
+
+
+class Command(BaseCommand):
+    help = "Пересобирает битовые карты занятости из записей Calendar"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--listing', type=int, action='append', dest='listing_ids',
+                            help="ID объявления (можно указать несколько раз)")
+        parser.add_argument('--chunk-size', type=int, default=500,
+                            help="Объявлений на одну транзакцию")
+
+    def handle(self, *args, listing_ids=None, chunk_size, **options):
+        written = BitmapService.rebuild(listing_ids, chunk_size=chunk_size)
+        self.stdout.write(self.style.SUCCESS(f"Записано битовых карт: {written}"))
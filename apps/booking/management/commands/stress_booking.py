@@ -0,0 +1,132 @@
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.utils import timezone
+from rest_framework.test import APIRequestFactory
+
+from apps.booking.enums import BookingStatus, Role
+from apps.booking.models import Address, Booking, Calendar, Listing, User
+from apps.booking.serializers import BookingCreateSerializer
+from apps.booking.management.commands._bench import make_lessor, make_listing
+
+
+class Command(BaseCommand):
+    help = (
+        "Нагрузочный тест: параллельные POST бронирований одного и разных объявлений. "
+        "Считает успешные брони, конфликты дат, двойные бронирования и пропускную способность; "
+        "другие ошибки валидации выводятся отдельно, и команда завершается с ошибкой. "
+        "Пишет в БД по-настоящему (нужен MySQL/PostgreSQL), тестовые данные удаляются в конце."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threads', type=int, default=8)
+        parser.add_argument('--attempts', type=int, default=20, help="Попыток на поток")
+        parser.add_argument('--nights', type=int, default=3)
+
+    def handle(self, *args, threads, attempts, nights, **options):
+        lessor = make_lessor()
+        hot = make_listing(lessor)
+        own = [make_listing(lessor) for _ in range(threads)]
+        lessees = [
+            User.objects.create(
+                username=f"stress_{uuid.uuid4().hex[:8]}",
+                email=f"stress_{uuid.uuid4().hex[:8]}@example.com",
+                first_name="Stress",
+                last_name="Lessee",
+                phone="+4900000000",
+                role=Role.LESSEE.value,
+            )
+            for _ in range(threads)
+        ]
+        listings = [hot] + own
+        start = timezone.now().date() + timedelta(days=3)
+        outcomes = Counter()
+        lock = threading.Lock()
+        factory = APIRequestFactory()
+        barrier = threading.Barrier(threads)
+
+        def book(user, listing, check_in):
+            request = factory.post('/')
+            request.user = user
+            serializer = BookingCreateSerializer(
+                data={
+                    'listing': listing.pk,
+                    'check_in_date': check_in.isoformat(),
+                    'check_out_date': (check_in + timedelta(days=nights)).isoformat(),
+                },
+                context={'request': request}
+            )
+            if not serializer.is_valid():
+                # Конфликт - только занятые даты; остальные ошибки - проблема
+                # теста или кода, а не обнаруженный конфликт
+                if 'dates' in serializer.errors:
+                    return 'conflict'
+                return f"invalid: {', '.join(sorted(serializer.errors))}"
+            try:
+                serializer.save()
+            except Exception as exc:
+                if 'dates' in getattr(exc, 'detail', {}):
+                    return 'conflict'
+                return f"error: {type(exc).__name__}"
+            return 'created'
+
+        def worker(number):
+            try:
+                barrier.wait()
+                for attempt in range(attempts):
+                    if attempt % 2 == 0:
+                        # Все потоки бьются за одни и те же даты одного объявления
+                        result = book(lessees[number], hot, start + timedelta(days=attempt * nights))
+                    else:
+                        # Свое объявление у каждого потока - конфликтов быть не должно
+                        result = book(lessees[number], own[number], start + timedelta(days=attempt * nights))
+                    with lock:
+                        outcomes[result] += 1
+            finally:
+                connection.close()
+
+        try:
+            started = time.perf_counter()
+            pool = [threading.Thread(target=worker, args=(number,)) for number in range(threads)]
+            for thread in pool:
+                thread.start()
+            for thread in pool:
+                thread.join()
+            elapsed = time.perf_counter() - started
+
+            double_booked = 0
+            for listing in listings:
+                intervals = sorted(Booking.objects.filter(
+                    listing=listing,
+                    status__in=BookingStatus.active()
+                ).values_list('check_in_date', 'check_out_date'))
+                double_booked += sum(
+                    1 for previous, current in zip(intervals, intervals[1:])
+                    if current[0] < previous[1]
+                )
+
+            total = sum(outcomes.values())
+            for result, count in sorted(outcomes.items()):
+                self.stdout.write(f"{result:<30} {count}")
+            self.stdout.write(f"Запросов: {total} за {elapsed:.2f} с ({total / elapsed:.1f} запр/с)")
+            style = self.style.SUCCESS if not double_booked else self.style.ERROR
+            self.stdout.write(style(f"Двойных бронирований: {double_booked}"))
+            failed = sum(
+                count for result, count in outcomes.items()
+                if result.startswith(('invalid', 'error'))
+            )
+            if failed:
+                raise CommandError(f"Запросов с ошибками, не связанными с конфликтом дат: {failed}")
+        finally:
+            listing_ids = [listing.pk for listing in listings]
+            Calendar.objects.filter(listing_id__in=listing_ids).delete()
+            Booking.objects.filter(listing_id__in=listing_ids).delete()
+            address_ids = [listing.address_id for listing in listings]
+            Listing.objects.filter(pk__in=listing_ids).delete()
+            Address.objects.filter(pk__in=address_ids).delete()
+            User.objects.filter(pk__in=[lessor.pk] + [user.pk for user in lessees]).delete()
@@ -0,0 +1,30 @@
+# Generated by Django 6.0 on 2026-10-18 01:18
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0004_alter_address_country'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityBitmap',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('year', models.PositiveSmallIntegerField(verbose_name='Год')),
+                ('bits', models.BinaryField(max_length=46, verbose_name='Битовая карта занятости')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='availability_bitmaps', to='booking.listing', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Битовая карта занятости',
+                'verbose_name_plural': 'Битовые карты занятости',
+                'db_table': 'availability_bitmap',
+                'unique_together': {('listing', 'year')},
+            },
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 6.0 on 2026-10-18 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0005_availability_bitmap'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['listing', 'check_in_date', 'check_out_date'], name='booking_listing_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 6.0 on 2026-10-18 01:23
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0006_booking_listing_dates_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarMonthSummary',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('month', models.DateField(verbose_name='Месяц (первое число)')),
+                ('nights_total', models.PositiveIntegerField(default=0, verbose_name='Ночей в календаре')),
+                ('nights_booked', models.PositiveIntegerField(default=0, verbose_name='Занятых ночей')),
+                ('revenue', models.DecimalField(decimal_places=2, default=0, max_digits=12, verbose_name='Выручка за занятые ночи')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='calendar_summaries', to='booking.listing', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Итоги календаря за месяц',
+                'verbose_name_plural': 'Итоги календаря по месяцам',
+                'db_table': 'calendar_month_summary',
+                'ordering': ['month'],
+                'unique_together': {('listing', 'month')},
+            },
+        ),
+    ]
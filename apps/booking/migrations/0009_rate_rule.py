@@ -0,0 +1,39 @@
+# Generated by Django 6.0 on 2026-10-18 02:10
+
+import django.core.validators
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0008_idempotency_key'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RateRule',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('season', 'Сезонная цена'), ('weekend', 'Наценка на выходные'), ('override', 'Цена на конкретные даты'), ('length_of_stay', 'Скидка за длительность')], max_length=20, verbose_name='Вид правила')),
+                ('start_date', models.DateField(blank=True, null=True, verbose_name='Действует с')),
+                ('end_date', models.DateField(blank=True, null=True, verbose_name='Действует по (включительно)')),
+                ('price', models.DecimalField(blank=True, decimal_places=2, max_digits=10, null=True, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Цена за ночь')),
+                ('percent', models.DecimalField(blank=True, decimal_places=2, max_digits=5, null=True, validators=[django.core.validators.MinValueValidator(-100), django.core.validators.MaxValueValidator(500)], verbose_name='Процент (наценка или скидка)')),
+                ('min_nights', models.PositiveIntegerField(blank=True, null=True, verbose_name='От ночей')),
+                ('priority', models.PositiveSmallIntegerField(default=0, verbose_name='Приоритет')),
+                ('is_active', models.BooleanField(default=True, verbose_name='Активно')),
+                ('created_at', models.DateTimeField(auto_now_add=True, verbose_name='Дата создания')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='Дата обновления')),
+                ('listing', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='rate_rules', to='booking.listing', verbose_name='Объявление')),
+            ],
+            options={
+                'verbose_name': 'Правило цены',
+                'verbose_name_plural': 'Правила цен',
+                'db_table': 'rate_rule',
+                'ordering': ['listing', 'kind', 'priority'],
+                'indexes': [models.Index(fields=['listing', 'is_active'], name='rate_rule_listing_active_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 6.0 on 2026-10-18 02:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0009_rate_rule'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'check_in_date'], name='booking_status_check_in_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['status', 'check_out_date'], name='booking_status_check_out_idx'),
+        ),
+    ]
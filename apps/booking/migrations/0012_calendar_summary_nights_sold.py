@@ -0,0 +1,18 @@
+# Generated by Django 6.0 on 2026-10-18 03:50
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0011_booking_status_created_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='calendarmonthsummary',
+            name='nights_sold',
+            field=models.PositiveIntegerField(default=0, verbose_name='Проданных ночей'),
+        ),
+    ]
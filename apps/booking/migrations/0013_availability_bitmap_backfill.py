@@ -0,0 +1,55 @@
+# Generated by Django 6.0 on 2026-10-18 14:05
+
+from django.db import migrations
+
+# Миграция не зависит от apps.booking.bitmap и текущих моделей: формат
+# карты на момент миграции - 46 байт little-endian, бит N = (N+1)-й день года
+CHUNK_SIZE = 500
+YEAR_BYTES = 46
+
+
+def backfill(apps, schema_editor):
+    """
+    Карты для занятых дней, закрытых до появления AvailabilityBitmap:
+    проверки доступности теперь читают карты, а не Calendar.
+    Пачками по CHUNK_SIZE объявлений.
+    """
+    Listing = apps.get_model('booking', 'Listing')
+    Calendar = apps.get_model('booking', 'Calendar')
+    AvailabilityBitmap = apps.get_model('booking', 'AvailabilityBitmap')
+
+    listings = Listing.objects.order_by('id').values_list('id', flat=True)
+    last_id = 0
+    while True:
+        chunk = list(listings.filter(id__gt=last_id)[:CHUNK_SIZE])
+        if not chunk:
+            break
+        last_id = chunk[-1]
+
+        bitmaps = {}
+        for listing_id, target_date in Calendar.objects.filter(
+            listing_id__in=chunk,
+            is_available=False
+        ).values_list('listing_id', 'target_date').order_by():
+            key = (listing_id, target_date.year)
+            bitmaps[key] = bitmaps.get(key, 0) | 1 << (target_date.timetuple().tm_yday - 1)
+
+        AvailabilityBitmap.objects.filter(listing_id__in=chunk).delete()
+        AvailabilityBitmap.objects.bulk_create(
+            [
+                AvailabilityBitmap(listing_id=listing_id, year=year, bits=value.to_bytes(YEAR_BYTES, 'little'))
+                for (listing_id, year), value in bitmaps.items()
+            ],
+            batch_size=1000
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('booking', '0012_calendar_summary_nights_sold'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill, migrations.RunPython.noop),
+    ]
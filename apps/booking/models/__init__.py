@@ -8,6 +8,10 @@ __all__ = [
     'Calendar',
     "SearchHistory",
     "ViewHistory",
+    "AvailabilityBitmap",
+    "CalendarMonthSummary",
+    "IdempotencyKey",
+    "RateRule",
 
 ]
 
@@ -20,4 +24,7 @@ from apps.booking.models.search_history import SearchHistory
 from apps.booking.models.view_history import ViewHistory
 from apps.booking.models.calendar import Calendar
 from apps.booking.models.address import Address
-
+from apps.booking.models.availability_bitmap import AvailabilityBitmap
+from apps.booking.models.calendar_summary import CalendarMonthSummary
+from apps.booking.models.idempotency_key import IdempotencyKey
+from apps.booking.models.rate_rule import RateRule
@@ -0,0 +1,28 @@
+from django.db import models
+
+
+class AvailabilityBitmap(models.Model):
+    """
+    Компактное представление занятости объявления за календарный год:
+    бит N = ночь (N+1)-го дня года, 1 - занято, 0 - свободно.
+    Ведется параллельно с Calendar (AvailabilityService.block_*/free_*,
+    Calendar.save/delete) и служит для проверок занятости вместо строк Calendar.
+    """
+    listing = models.ForeignKey(
+        'Listing',
+        on_delete=models.CASCADE,
+        related_name='availability_bitmaps',
+        verbose_name="Объявление"
+    )
+    year = models.PositiveSmallIntegerField(verbose_name="Год")
+    bits = models.BinaryField(max_length=46, verbose_name="Битовая карта занятости")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        db_table = "availability_bitmap"
+        verbose_name = "Битовая карта занятости"
+        verbose_name_plural = "Битовые карты занятости"
+        unique_together = ['listing', 'year']
+
+    def __str__(self):
+        return f"{self.listing_id}/{self.year}"
@@ -1,13 +1,37 @@
-import uuid
+import secrets
+from decimal import Decimal
 
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from django.forms import BooleanField
 from apps.booking.enums import BookingStatus
+from apps.booking.cache_versions import bump_version
 from datetime import timedelta
 
 from django.utils import timezone
 
+# Короткий код бронирования: 12 символов base32 Крокфорда (без I, L, O, U),
+# 60 бит случайности. Старые коды - uuid4 в 36 символов, поэтому max_length 36.
+BOOKING_CODE_ALPHABET = '0123456789ABCDEFGHJKMNPQRSTVWXYZ'
+BOOKING_CODE_LENGTH = 12
+
+# Поля, от которых зависит total_amount
+PRICING_FIELDS = ('check_in_date', 'check_out_date', 'price', 'number_of_guests')
+
+
+def generate_booking_code():
+    return ''.join(secrets.choice(BOOKING_CODE_ALPHABET) for _ in range(BOOKING_CODE_LENGTH))
+
+
+def normalize_booking_code(code):
+    """
+    Код в том виде, в котором он хранится: короткие коды - в верхнем
+    регистре (гость может ввести их строчными), uuid - в нижнем.
+    """
+    code = str(code).strip()
+    return code.lower() if len(code) == 36 else code.upper()
+
+
 class Booking(models.Model):
 
     listing = models.ForeignKey(
@@ -122,11 +146,64 @@ class Booking(models.Model):
         verbose_name = "Бронирование"
         verbose_name_plural = "Бронирования"
         ordering = ['-created_at']
+        indexes = [
+            # Поиск пересечений по датам для конкретного объявления
+            models.Index(
+                fields=['listing', 'check_in_date', 'check_out_date'],
+                name='booking_listing_dates_idx'
+            ),
+            # Перевод статусов по датам (advance_booking_statuses)
+            models.Index(
+                fields=['status', 'check_in_date'],
+                name='booking_status_check_in_idx'
+            ),
+            models.Index(
+                fields=['status', 'check_out_date'],
+                name='booking_status_check_out_idx'
+            ),
+            # Истечение неподтвержденных бронирований (expire_pending_bookings)
+            models.Index(
+                fields=['status', 'created_at'],
+                name='booking_status_created_idx'
+            ),
+        ]
 
 
     def __str__(self):
         return f"Бронирование #{self.booking_code} - {self.listing.title}"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Значения из БД - чтобы при сохранении понять, что изменилось
+        instance._loaded_pricing = {
+            name: value for name, value in zip(field_names, values) if name in PRICING_FIELDS
+        }
+        return instance
+
+    def _changed_pricing_fields(self):
+        """Поля из PRICING_FIELDS, измененные после загрузки из БД"""
+        loaded = getattr(self, '_loaded_pricing', {})
+        return {name for name, value in loaded.items() if getattr(self, name) != value}
+
+    def _recalculate_amount(self, changed):
+        """
+        Пересчет суммы после изменения дат, гостей или цены.
+        Цена изменена вручную - она считается ценой ночи без скидок;
+        иначе стоимость пересчитывается по правилам цен объявления, как при создании.
+        """
+        from apps.booking.pricing import PricingService
+
+        nights = self.total_nights
+        if 'price' in changed:
+            self.total_amount = PricingService.fixed_price_total(self.price, nights, self.number_of_guests)
+            return
+        quote = PricingService.quote(
+            self.listing, self.check_in_date, self.check_out_date, self.number_of_guests
+        )
+        self.price = (quote['base_price'] / nights).quantize(Decimal('0.01'))
+        self.total_amount = quote['total']
+
     def clean(self):
         """Валидация данных"""
         from django.core.exceptions import ValidationError
@@ -169,26 +246,42 @@ class Booking(models.Model):
                 'price': 'Цена должна быть положительным числом'
             })
 
-    def save(self, *args, **kwargs):
-        """Сохранение с расчетами"""
+    def save(self, *args, validate=True, **kwargs):
+        """
+        Сохранение с расчетами.
+        validate=False - данные уже проверены (сериализатором или переходом
+        статуса), full_clean() и его запросы к БД пропускаются.
+        """
         # Генерация кода бронирования
+        code_generated = False
         if not self.booking_code:
-            self.booking_code = str(uuid.uuid4())
+            self.booking_code = generate_booking_code()
+            code_generated = True
 
         # Установка цены из листинга
-        if self.listing and (not self.price or self.price <= 0):
+        if (not self.price or self.price <= 0) and self.listing_id:
             self.price = self.listing.price
 
         # Расчет количества ночей
         if self.check_in_date and self.check_out_date:
             self.total_nights = (self.check_out_date - self.check_in_date).days
 
-        # Расчет общей суммы
-        if self.total_nights and self.price:
-            self.total_amount = self.price * self.total_nights
-
-        # Автозаполнение данных гостя
-        if self.lessee:
+        # Расчет общей суммы: при создании - если ее не передал вызывающий
+        # (сериализатор, импорт), при изменении - если изменились даты, гости или цена
+        if self._state.adding:
+            if self.total_amount is None and self.total_nights and self.price:
+                self.total_amount = self.price * self.total_nights
+        elif self.total_nights and (changed := self._changed_pricing_fields()):
+            self._recalculate_amount(changed)
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {
+                    *kwargs['update_fields'], 'price', 'total_nights', 'total_amount'
+                }
+
+        # Автозаполнение данных гостя (арендатора загружаем только если чего-то не хватает)
+        if self.lessee_id and not all([
+            self.guest_email, self.guest_phone, self.guest_first_name, self.guest_last_name
+        ]):
             if not self.guest_email:
                 self.guest_email = self.lessee.email
             if not self.guest_phone and hasattr(self.lessee, 'phone'):
@@ -206,10 +299,21 @@ class Booking(models.Model):
         elif self.status == BookingStatus.COMPLETED.value and not self.completed_at:
             self.completed_at = timezone.now()
 
-        # Валидация перед сохранением
-        self.full_clean()
+        # Валидация перед сохранением. Свежесгенерированный код не проверяем
+        # на уникальность отдельным запросом - это сделает уникальный индекс.
+        if validate:
+            self.full_clean(exclude=['booking_code'] if code_generated else None)
 
         super().save(*args, **kwargs)
+        self._loaded_pricing = {name: getattr(self, name) for name in PRICING_FIELDS}
+        # Сбрасываем индексы интервалов бронирований объявления
+        bump_version('bookings', self.listing_id)
+
+    def delete(self, *args, **kwargs):
+        listing_id = self.listing_id
+        result = super().delete(*args, **kwargs)
+        bump_version('bookings', listing_id)
+        return result
 
     @property
     def is_active(self):
@@ -234,7 +338,7 @@ class Booking(models.Model):
         """Подтвердить бронирование"""
         self.status = BookingStatus.CONFIRMED.value
         self.confirmed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'confirmed_at', 'updated_at'], validate=False)
 
     def mark_as_cancelled(self, user=None, reason=""):
         """Отменить бронирование"""
@@ -242,11 +346,14 @@ class Booking(models.Model):
         self.cancelled_at = timezone.now()
         self.cancelled_by = user
         self.cancellation_reason = reason
-        self.save()
+        self.save(
+            update_fields=['status', 'cancelled_at', 'cancelled_by', 'cancellation_reason', 'updated_at'],
+            validate=False
+        )
 
     def mark_as_completed(self):
         """Завершить бронирование"""
         self.status = BookingStatus.COMPLETED.value
         self.completed_at = timezone.now()
-        self.save()
+        self.save(update_fields=['status', 'completed_at', 'updated_at'], validate=False)
 
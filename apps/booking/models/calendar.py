@@ -1,5 +1,8 @@
-from django.db import models
+from datetime import timedelta
+
+from django.db import models, transaction
 from apps.booking.enums import AvailabilityStatus, TimeSlot
+from apps.booking.cache_versions import bump_version
 # Заезд (check-in) → после 14:00
 # Выезд (check-out) → до 10:00
 
@@ -35,4 +38,28 @@ class Calendar(models.Model):
 
     def __str__(self):
         status = "Свободно" if self.is_available else "Занято"
-        return f"{self.target_date}: {status}"
\ No newline at end of file
+        return f"{self.target_date}: {status}"
+
+    def _mark_bitmap(self, busy):
+        """Одиночные правки (админка, CalendarViewSet) - в битовую карту занятости"""
+        from apps.booking.bitmap import BitmapService
+
+        if self.listing_id:
+            BitmapService.mark_range(
+                self.listing_id, self.target_date, self.target_date + timedelta(days=1), busy=busy
+            )
+
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            self._mark_bitmap(busy=not self.is_available)
+        # Сбрасываем кешированные расчеты по календарю объявления
+        bump_version('calendar', self.listing_id)
+
+    def delete(self, *args, **kwargs):
+        listing_id = self.listing_id
+        with transaction.atomic():
+            result = super().delete(*args, **kwargs)
+            self._mark_bitmap(busy=False)
+        bump_version('calendar', listing_id)
+        return result
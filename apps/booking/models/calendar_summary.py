@@ -0,0 +1,35 @@
+from django.db import models
+
+
+class CalendarMonthSummary(models.Model):
+    """
+    Итоги календаря объявления за месяц. Заполняется командой compact_calendar,
+    после чего дневные записи Calendar за этот период удаляются.
+    """
+    listing = models.ForeignKey(
+        'Listing',
+        on_delete=models.CASCADE,
+        related_name='calendar_summaries',
+        verbose_name="Объявление"
+    )
+    month = models.DateField(verbose_name="Месяц (первое число)")
+    nights_total = models.PositiveIntegerField(default=0, verbose_name="Ночей в календаре")
+    nights_booked = models.PositiveIntegerField(default=0, verbose_name="Занятых ночей")
+    nights_sold = models.PositiveIntegerField(default=0, verbose_name="Проданных ночей")
+    revenue = models.DecimalField(
+        max_digits=12,
+        decimal_places=2,
+        default=0,
+        verbose_name="Выручка за занятые ночи"
+    )
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        db_table = "calendar_month_summary"
+        verbose_name = "Итоги календаря за месяц"
+        verbose_name_plural = "Итоги календаря по месяцам"
+        unique_together = ['listing', 'month']
+        ordering = ['month']
+
+    def __str__(self):
+        return f"{self.listing_id} {self.month:%Y-%m}: {self.nights_booked}/{self.nights_total}"
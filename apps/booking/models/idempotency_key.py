@@ -0,0 +1,31 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import models
+
+
+class IdempotencyKey(models.Model):
+    """
+    Сохраненный ответ на запрос с заголовком Idempotency-Key.
+    status_code = NULL - запрос еще выполняется.
+    """
+    key = models.CharField(max_length=255, verbose_name="Ключ")
+    scope = models.CharField(max_length=255, verbose_name="Пользователь, метод и путь")
+    request_hash = models.CharField(max_length=64, verbose_name="Хеш тела запроса")
+    status_code = models.PositiveSmallIntegerField(null=True, blank=True, verbose_name="Код ответа")
+    response_body = models.JSONField(null=True, blank=True, encoder=DjangoJSONEncoder,
+                                     verbose_name="Тело ответа")
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Истекает")
+
+    class Meta:
+        db_table = "idempotency_key"
+        verbose_name = "Ключ идемпотентности"
+        verbose_name_plural = "Ключи идемпотентности"
+        constraints = [
+            models.UniqueConstraint(
+                fields=['key', 'scope'],
+                name='unique_idempotency_key_per_scope'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.scope} {self.key}"
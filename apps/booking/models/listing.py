@@ -2,6 +2,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from django.db import models
 from apps.booking.enums import PropertyType, Status
 from apps.booking.managers import SoftDeleteManager
+from apps.booking.cache_versions import bump_version
 
 
 class Listing(models.Model):
@@ -125,6 +126,11 @@ class Listing(models.Model):
         city_name = self.address.city if self.address else "Без адреса"
         return f"{self.title} - {city_name} ({self.price}€)"
 
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Базовая цена могла измениться - таблица цен пересобирается
+        bump_version('pricing', self.pk)
+
     @property
     def city(self):
         return self.address.city if self.address else None
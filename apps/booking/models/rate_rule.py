@@ -0,0 +1,96 @@
+from django.core.validators import MinValueValidator, MaxValueValidator
+from django.db import models
+
+from apps.booking.cache_versions import bump_version
+from apps.booking.enums import RateRuleKind
+
+
+class RateRule(models.Model):
+    """
+    Правило цены объявления. Правила компилируются в таблицу цен по ночам
+    (см. apps/booking/pricing.py):
+    - season: цена (price) или процент к базовой цене (percent) на период;
+    - weekend: процент к ночам пятницы и субботы (необязательно в пределах периода);
+    - override: фиксированная цена на даты, перекрывает остальные правила;
+    - length_of_stay: скидка percent при проживании от min_nights ночей.
+    При пересечении правил одного вида побеждает больший priority.
+    """
+    listing = models.ForeignKey(
+        'Listing',
+        on_delete=models.CASCADE,
+        related_name='rate_rules',
+        verbose_name="Объявление"
+    )
+    kind = models.CharField(
+        max_length=20,
+        choices=RateRuleKind.choices(),
+        verbose_name="Вид правила"
+    )
+    start_date = models.DateField(null=True, blank=True, verbose_name="Действует с")
+    end_date = models.DateField(null=True, blank=True, verbose_name="Действует по (включительно)")
+    price = models.DecimalField(
+        max_digits=10,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(0)],
+        verbose_name="Цена за ночь"
+    )
+    percent = models.DecimalField(
+        max_digits=5,
+        decimal_places=2,
+        null=True,
+        blank=True,
+        validators=[MinValueValidator(-100), MaxValueValidator(500)],
+        verbose_name="Процент (наценка или скидка)"
+    )
+    min_nights = models.PositiveIntegerField(null=True, blank=True, verbose_name="От ночей")
+    priority = models.PositiveSmallIntegerField(default=0, verbose_name="Приоритет")
+    is_active = models.BooleanField(default=True, verbose_name="Активно")
+
+    created_at = models.DateTimeField(auto_now_add=True, verbose_name="Дата создания")
+    updated_at = models.DateTimeField(auto_now=True, verbose_name="Дата обновления")
+
+    class Meta:
+        db_table = "rate_rule"
+        verbose_name = "Правило цены"
+        verbose_name_plural = "Правила цен"
+        ordering = ['listing', 'kind', 'priority']
+        indexes = [
+            models.Index(fields=['listing', 'is_active'], name='rate_rule_listing_active_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.listing_id} {self.kind} {self.start_date or ''}-{self.end_date or ''}"
+
+    def clean(self):
+        from django.core.exceptions import ValidationError
+
+        if self.kind in (RateRuleKind.SEASON, RateRuleKind.OVERRIDE):
+            if not self.start_date or not self.end_date:
+                raise ValidationError({'start_date': 'Укажите период действия правила'})
+        if self.start_date and self.end_date and self.end_date < self.start_date:
+            raise ValidationError({'end_date': 'Дата окончания раньше даты начала'})
+
+        if self.kind == RateRuleKind.SEASON and self.price is None and self.percent is None:
+            raise ValidationError({'price': 'Укажите цену или процент'})
+        if self.kind == RateRuleKind.OVERRIDE and self.price is None:
+            raise ValidationError({'price': 'Укажите цену'})
+        if self.kind == RateRuleKind.WEEKEND and self.percent is None:
+            raise ValidationError({'percent': 'Укажите процент наценки'})
+        if self.kind == RateRuleKind.LENGTH_OF_STAY:
+            if not self.min_nights:
+                raise ValidationError({'min_nights': 'Укажите минимальное число ночей'})
+            if self.percent is None or not 0 < self.percent <= 100:
+                raise ValidationError({'percent': 'Скидка: от 0 до 100%'})
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # Таблица цен объявления пересобирается при следующем расчете
+        bump_version('pricing', self.listing_id)
+
+    def delete(self, *args, **kwargs):
+        listing_id = self.listing_id
+        result = super().delete(*args, **kwargs)
+        bump_version('pricing', listing_id)
+        return result
@@ -0,0 +1,137 @@
+"""
+Keyset-пагинация (курсор по паре (поле сортировки, id)).
+
+В отличие от OFFSET, страница любой глубины выбирается по индексу
+условием "после последней строки предыдущей страницы", поэтому время
+не растет с номером страницы, а вставки между запросами не сдвигают
+страницы. Сортировка всегда дополняется id - порядок строк стабилен
+даже при одинаковых значениях поля.
+"""
+import base64
+import json
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    page_size = 50
+    max_page_size = 200
+    page_size_query_param = 'page_size'
+    cursor_query_param = 'cursor'
+    ordering_query_param = 'ordering'
+    # ?count=false - не считать общее количество (экономит COUNT(*) на больших выборках)
+    count_query_param = 'count'
+
+    def get_ordering(self, request, view):
+        """
+        Поле сортировки: из ?ordering=, если оно есть в view.ordering_fields,
+        иначе сортировка действия (view.action_ordering) или view.ordering.
+        Возвращает (поле, по убыванию).
+        """
+        requested = request.query_params.get(self.ordering_query_param, '')
+        if requested.lstrip('-') in getattr(view, 'ordering_fields', []):
+            ordering = requested
+        else:
+            ordering = getattr(view, 'action_ordering', {}).get(view.action) or view.ordering[0]
+        return ordering.lstrip('-'), ordering.startswith('-')
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params.get(self.page_size_query_param, self.page_size))
+        except ValueError:
+            return self.page_size
+        return max(1, min(size, self.max_page_size))
+
+    def decode_cursor(self, request):
+        """Курсор: (значение поля, id, назад ли) или None для первой страницы"""
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            value, pk, backwards = json.loads(base64.urlsafe_b64decode(encoded.encode()))
+            return value, int(pk), bool(backwards)
+        except (TypeError, ValueError):
+            raise NotFound("Некорректный курсор")
+
+    def encode_cursor(self, value, pk, backwards):
+        payload = json.dumps([value, pk, backwards], default=str)
+        return base64.urlsafe_b64encode(payload.encode()).decode()
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.field, descending = self.get_ordering(request, view)
+        self.page_size_value = self.get_page_size(request)
+        cursor = self.decode_cursor(request)
+
+        self.count = None
+        if request.query_params.get(self.count_query_param, 'true').lower() not in ('0', 'false', 'no'):
+            self.count = queryset.count()
+
+        backwards = bool(cursor and cursor[2])
+        # Для предыдущей страницы идем в обратную сторону и потом разворачиваем
+        reverse = descending != backwards
+        prefix = '-' if reverse else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+
+        if cursor:
+            try:
+                value = queryset.model._meta.get_field(self.field).to_python(cursor[0])
+            except DjangoValidationError:
+                raise NotFound("Некорректный курсор")
+            lookup = 'lt' if reverse else 'gt'
+            queryset = queryset.filter(
+                Q(**{f'{self.field}__{lookup}': value}) |
+                Q(**{self.field: value, f'id__{lookup}': cursor[1]})
+            )
+
+        rows = list(queryset[:self.page_size_value + 1])
+        has_more = len(rows) > self.page_size_value
+        rows = rows[:self.page_size_value]
+        if backwards:
+            rows.reverse()
+
+        self.has_next = has_more if not backwards else True
+        self.has_previous = bool(cursor) and (has_more if backwards else True)
+        self.first = rows[0] if rows else None
+        self.last = rows[-1] if rows else None
+        if not rows:
+            self.has_next = self.has_previous = False
+        return rows
+
+    def _link(self, row, backwards):
+        url = self.request.build_absolute_uri()
+        cursor = self.encode_cursor(getattr(row, self.field), row.pk, backwards)
+        return replace_query_param(url, self.cursor_query_param, cursor)
+
+    def get_next_link(self):
+        return self._link(self.last, False) if self.has_next else None
+
+    def get_previous_link(self):
+        return self._link(self.first, True) if self.has_previous else None
+
+    def get_paginated_response(self, data):
+        payload = {
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        }
+        if self.count is not None:
+            payload = {'count': self.count, **payload}
+        return Response(payload)
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'required': ['results'],
+            'properties': {
+                'count': {'type': 'integer'},
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
@@ -0,0 +1,257 @@
+"""
+Расчет стоимости проживания по правилам цен объявления (RateRule).
+
+Правила объявления компилируются в таблицу цен по ночам на горизонт
+CALENDAR_HORIZON_DAYS (в центах) и префиксные суммы к ней: сумма за любой
+диапазон дат - разность двух элементов. Таблица хранится в общем кеше
+и устаревает по версии 'pricing' объявления (см. cache_versions), которая
+увеличивается при изменении объявления или его правил.
+
+Готовые расчеты для карточек поиска (cached_quotes) кешируются по ключу
+объявление/даты/гости и включают доступность дат, поэтому зависят еще
+и от версий 'calendar' и 'bookings'.
+"""
+from datetime import timedelta
+from decimal import Decimal, ROUND_HALF_UP
+from itertools import accumulate
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils import timezone
+
+from apps.booking.availability import AvailabilityService
+from apps.booking.cache_versions import get_versions
+from apps.booking.enums import RateRuleKind
+from apps.booking.models import RateRule
+
+EXTRA_GUEST_FEE = Decimal('20')  # за каждого гостя сверх первого за ночь
+WEEKEND_NIGHTS = (4, 5)  # ночи с пятницы и с субботы
+CACHE_TIMEOUT = 24 * 60 * 60
+QUOTE_CACHE_TIMEOUT = 60 * 60
+
+
+def to_cents(amount):
+    return int((Decimal(amount) * 100).quantize(Decimal('1'), rounding=ROUND_HALF_UP))
+
+
+def from_cents(cents):
+    return (Decimal(cents) / 100).quantize(Decimal('0.01'))
+
+
+def apply_percent(cents, percent):
+    return int((Decimal(cents) * (100 + Decimal(percent)) / 100).quantize(
+        Decimal('1'), rounding=ROUND_HALF_UP
+    ))
+
+
+def compile_prices(base_price, rules, start_date, days):
+    """
+    Цены по ночам [start_date, start_date + days) в центах.
+    Порядок: базовая цена -> сезон -> выходные -> фиксированные даты.
+    """
+    base = to_cents(base_price)
+    prices = [base] * days
+    end_date = start_date + timedelta(days=days)
+
+    def nights(rule):
+        """Индексы ночей таблицы, на которые действует правило"""
+        first = max(rule.start_date or start_date, start_date)
+        last = min(rule.end_date + timedelta(days=1) if rule.end_date else end_date, end_date)
+        return range((first - start_date).days, max((last - start_date).days, 0))
+
+    by_kind = {}
+    # Правила с большим приоритетом применяются последними и перекрывают остальные
+    for rule in sorted(rules, key=lambda rule: (rule.priority, rule.pk or 0)):
+        by_kind.setdefault(rule.kind, []).append(rule)
+
+    for rule in by_kind.get(RateRuleKind.SEASON, []):
+        price = to_cents(rule.price) if rule.price is not None else apply_percent(base, rule.percent)
+        for index in nights(rule):
+            prices[index] = price
+
+    weekend_percent = {}
+    for rule in by_kind.get(RateRuleKind.WEEKEND, []):
+        for index in nights(rule):
+            if (start_date + timedelta(days=index)).weekday() in WEEKEND_NIGHTS:
+                weekend_percent[index] = rule.percent
+    for index, percent in weekend_percent.items():
+        prices[index] = apply_percent(prices[index], percent)
+
+    for rule in by_kind.get(RateRuleKind.OVERRIDE, []):
+        price = to_cents(rule.price)
+        for index in nights(rule):
+            prices[index] = price
+
+    return prices
+
+
+class RateTable:
+    """Скомпилированные цены объявления по ночам и префиксные суммы"""
+
+    def __init__(self, start_date, prices, discounts):
+        self.start_date = start_date
+        self.prices = prices
+        self.prefix = list(accumulate(prices, initial=0))
+        # [(min_nights, percent)] по возрастанию min_nights
+        self.discounts = sorted(discounts)
+
+    @property
+    def end_date(self):
+        return self.start_date + timedelta(days=len(self.prices))
+
+    def covers(self, check_in_date, check_out_date):
+        return self.start_date <= check_in_date and check_out_date <= self.end_date
+
+    def total(self, check_in_date, check_out_date):
+        """Сумма цен ночей [check_in_date, check_out_date) в центах"""
+        start = (check_in_date - self.start_date).days
+        end = (check_out_date - self.start_date).days
+        return self.prefix[end] - self.prefix[start]
+
+    def discount_percent(self, nights):
+        """Скидка за длительность: лучшая из доступных для nights ночей"""
+        return max(
+            (percent for min_nights, percent in self.discounts if min_nights <= nights),
+            default=0
+        )
+
+
+class PricingService:
+
+    @staticmethod
+    def _cache_key(listing_id, version, start_date):
+        return f"booking:rates:{listing_id}:{version}:{start_date.isoformat()}"
+
+    @staticmethod
+    def _build(listing, rules, start_date, days):
+        discounts = [
+            (rule.min_nights, rule.percent)
+            for rule in rules if rule.kind == RateRuleKind.LENGTH_OF_STAY
+        ]
+        nightly = [rule for rule in rules if rule.kind != RateRuleKind.LENGTH_OF_STAY]
+        return RateTable(start_date, compile_prices(listing.price, nightly, start_date, days), discounts)
+
+    @staticmethod
+    def rate_tables(listings):
+        """
+        Таблицы цен на горизонт от сегодняшнего дня: {listing_id: RateTable}.
+        Два запроса к кешу (версии и таблицы) и не более одного запроса
+        правил на все объявления, которых нет в кеше.
+        """
+        start_date = timezone.now().date()
+        listings = list(listings)
+        versions = get_versions('pricing', [listing.pk for listing in listings])
+        keys = {
+            PricingService._cache_key(listing.pk, versions[listing.pk], start_date): listing
+            for listing in listings
+        }
+        cached = cache.get_many(list(keys))
+        tables = {keys[key].pk: table for key, table in cached.items()}
+
+        missing = {listing.pk: (key, listing) for key, listing in keys.items() if key not in cached}
+        if missing:
+            rules = {}
+            for rule in RateRule.objects.filter(listing_id__in=missing, is_active=True):
+                rules.setdefault(rule.listing_id, []).append(rule)
+
+            built = {}
+            for listing_id, (key, listing) in missing.items():
+                tables[listing_id] = built[key] = PricingService._build(
+                    listing, rules.get(listing_id, []), start_date, settings.CALENDAR_HORIZON_DAYS
+                )
+            cache.set_many(built, CACHE_TIMEOUT)
+        return tables
+
+    @staticmethod
+    def rate_table(listing):
+        return PricingService.rate_tables([listing])[listing.pk]
+
+    @staticmethod
+    def quote(listing, check_in_date, check_out_date, guests=1, table=None):
+        """
+        Стоимость проживания:
+        {'nights', 'base_price', 'discount', 'extra_guest_charge', 'total'}.
+        Даты вне горизонта таблицы считаются по правилам напрямую.
+        """
+        nights = (check_out_date - check_in_date).days
+        table = table or PricingService.rate_table(listing)
+        if not table.covers(check_in_date, check_out_date):
+            rules = list(RateRule.objects.filter(listing=listing, is_active=True))
+            table = PricingService._build(listing, rules, check_in_date, nights)
+
+        base_cents = table.total(check_in_date, check_out_date)
+        discounted = apply_percent(base_cents, -table.discount_percent(nights))
+        extra_cents = to_cents(EXTRA_GUEST_FEE) * max(guests - 1, 0) * nights
+
+        return {
+            'nights': nights,
+            'base_price': from_cents(base_cents),
+            'discount': from_cents(base_cents - discounted),
+            'extra_guest_charge': from_cents(extra_cents),
+            'total': from_cents(discounted + extra_cents),
+        }
+
+    @staticmethod
+    def fixed_price_total(price, nights, guests=1):
+        """
+        Сумма по заданной цене ночи без правил цен и скидок, с доплатой
+        за гостей сверх первого - как в quote(). Для цен, указанных вручную
+        (импорт, изменение цены бронирования).
+        """
+        extra_cents = to_cents(EXTRA_GUEST_FEE) * max(guests - 1, 0) * nights
+        return from_cents(to_cents(price) * nights + extra_cents)
+
+    @staticmethod
+    def _quote_key(listing_id, versions, check_in_date, check_out_date, guests):
+        return "booking:quote:{}:{}:{}:{}:{}".format(
+            listing_id, ':'.join(str(version) for version in versions),
+            check_in_date.isoformat(), check_out_date.isoformat(), guests
+        )
+
+    @staticmethod
+    def cached_quotes(items):
+        """
+        Расчеты для списка {'listing', 'check_in_date', 'check_out_date', 'guests'}
+        с доступностью дат ('is_available', 'message'). Каждый расчет кешируется;
+        ключ включает версии 'pricing', 'calendar' и 'bookings' объявления, поэтому
+        изменение цены, правил, календаря или бронирований делает его устаревшим.
+        Без промахов кеша - ни одного запроса к БД; иначе не более 4 на весь список.
+        """
+        listing_ids = {item['listing'].pk for item in items}
+        versions = [get_versions(scope, listing_ids) for scope in ('pricing', 'calendar', 'bookings')]
+        keys = [
+            PricingService._quote_key(
+                item['listing'].pk,
+                [scope_versions[item['listing'].pk] for scope_versions in versions],
+                item['check_in_date'], item['check_out_date'], item['guests']
+            )
+            for item in items
+        ]
+        cached = cache.get_many(keys)
+
+        missing = [index for index, key in enumerate(keys) if key not in cached]
+        if missing:
+            availability = AvailabilityService.check_availability_batch([
+                {
+                    'listing_id': items[index]['listing'].pk,
+                    'check_in_date': items[index]['check_in_date'],
+                    'check_out_date': items[index]['check_out_date'],
+                }
+                for index in missing
+            ])
+            tables = PricingService.rate_tables({items[index]['listing'] for index in missing})
+
+            fresh = {}
+            for index, (is_available, message) in zip(missing, availability):
+                item = items[index]
+                listing = item['listing']
+                quote = PricingService.quote(
+                    listing, item['check_in_date'], item['check_out_date'], item['guests'],
+                    table=tables[listing.pk]
+                )
+                quote.update(is_available=is_available, message=message)
+                fresh[keys[index]] = quote
+            cache.set_many(fresh, QUOTE_CACHE_TIMEOUT)
+            cached.update(fresh)
+
+        return [cached[key] for key in keys]
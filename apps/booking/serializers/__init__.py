@@ -2,11 +2,16 @@ __all__ = [
     'ListingSerializer',
     'ListingUpdateSerializer',
     'ListingDetailedSerializer',
+    'PriceQuoteSerializer',
+    'QuoteBatchSerializer',
     'AddressSerializer',
     'AddressDetailSerializer',
     'BookingSerializer',
     'BookingUpdateSerializer',
     'CancelBookingSerializer',
+    'BookingImportSerializer',
+    'BookingBatchActionSerializer',
+    'BookingLookupSerializer',
     # 'ConfirmBookingSerializer',
     'BookingListSerializer',
     'UserListSerializer',
@@ -15,15 +20,20 @@ __all__ = [
     'ReviewSerializer',
     'CreateReviewSerializer',
     'CalendarAvailabilityCheckSerializer',
+    'AvailabilityBatchSerializer',
 ]
 
-from .listings import ListingSerializer, ListingDetailedSerializer, ListingUpdateSerializer
+from .listings import (ListingSerializer, ListingDetailedSerializer, ListingUpdateSerializer,
+                       PriceQuoteSerializer, QuoteBatchSerializer)
 from .addresses import AddressSerializer, AddressDetailSerializer
 from .bookings import (BookingSerializer, BookingCreateSerializer,
                        BookingUpdateSerializer,
                        BookingListSerializer,
                        # ConfirmBookingSerializer,
-                       CancelBookingSerializer)
+                       CancelBookingSerializer,
+                       BookingImportSerializer,
+                       BookingBatchActionSerializer,
+                       BookingLookupSerializer)
 from .users import UserListSerializer, UserDetailSerializer, UserCreateSerializer
 from .reviews import CreateReviewSerializer, ReviewSerializer
-from .calendars import CalendarAvailabilityCheckSerializer
+from .calendars import CalendarAvailabilityCheckSerializer, AvailabilityBatchSerializer
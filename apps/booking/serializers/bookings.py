@@ -1,10 +1,17 @@
+import io
+
 from rest_framework import serializers
+from django.db import transaction
 from apps.booking.models import Booking
 from apps.booking.enums import BookingStatus
 from django.utils import timezone
 from datetime import timedelta
+from decimal import Decimal
 from apps.booking.permissions import IsLessee
 from apps.booking.availability import AvailabilityService
+from apps.booking.pricing import PricingService
+from apps.booking import importer
+from apps.booking.transitions import MAX_IDS, cancellation_error
 
 
 class BookingSerializer(serializers.ModelSerializer):
@@ -30,9 +37,9 @@ class BookingSerializer(serializers.ModelSerializer):
     calendar_dates = serializers.SerializerMethodField(read_only=True)
 
     def get_calendar_dates(self, obj):
-        """Получить даты из календаря"""
+        """Получить даты из календаря (из prefetch_related, если он был)"""
         if hasattr(obj, 'calendar_days'):
-            return list(obj.calendar_days.values_list('target_date', flat=True))
+            return [day.target_date for day in obj.calendar_days.all()]
         return []
 
 
@@ -249,7 +256,7 @@ class BookingCreateSerializer(serializers.ModelSerializer):
                 'check_in_date': 'Дата заезда должна быть в будущем'
             })
 
-        # # Проверяем доступность через календарь
+        # Календарь и пересечения с другими бронированиями - одним запросом
         is_available, message = AvailabilityService.check_availability(
             listing, check_in, check_out
         )
@@ -257,19 +264,6 @@ class BookingCreateSerializer(serializers.ModelSerializer):
         if not is_available:
             raise serializers.ValidationError({"dates": message})
 
-        # Есть ли пересечения с другими бронированиями?
-        conflicting = Booking.objects.filter(
-            listing=data['listing'],
-            check_in_date__lt=data['check_out_date'],  # Начало другой брони < нашего выезда
-            check_out_date__gt=data['check_in_date'],  # Конец другой брони > нашего заезда
-            status__in=['confirmed', 'pending']  # Только активные брони
-        ).exists()
-
-        if conflicting:
-            raise serializers.ValidationError({
-                "dates": "На эти даты уже есть бронирование"
-            })
-
         # Проверяем количество гостей
         if guests < 1:
             raise serializers.ValidationError({
@@ -288,18 +282,15 @@ class BookingCreateSerializer(serializers.ModelSerializer):
                 'check_out_date': f'Минимальный срок проживания: {listing.min_stay_days} дней'
             })
 
-        # Рассчитываем цену
-        nights = (check_out - check_in).days
-        base_price = listing.price * nights
-
-        # 3. Доплата за гостей (если > 1)
-        extra_charge = 0
-        if guests > 1:
-            extra_charge = (guests - 1) * 20 * nights  # 20 euro за доп. гостя/ночь
+        if listing.max_stay_days and nights > listing.max_stay_days:
+            raise serializers.ValidationError({
+                'check_out_date': f'Максимальный срок проживания: {listing.max_stay_days} дней'
+            })
 
-        total_price = base_price + extra_charge
-        data['price'] = base_price  # цена без доплат
-        data['total_amount'] = total_price  # итоговая сумма
+        # Рассчитываем цену по правилам объявления
+        quote = PricingService.quote(listing, check_in, check_out, guests)
+        data['price'] = (quote['base_price'] / nights).quantize(Decimal('0.01'))  # средняя цена ночи
+        data['total_amount'] = quote['total']  # итоговая сумма со скидкой и доплатой за гостей
 
         return data
 
@@ -313,15 +304,33 @@ class BookingCreateSerializer(serializers.ModelSerializer):
             validated_data['lessee'] = request.user
         else:
             validated_data['lessee'] = None
-        booking = super().create(validated_data)
-
-        # Блокируем даты в календаре
-        AvailabilityService.block_dates(
-            listing=booking.listing,
-            check_in_date=booking.check_in_date,
-            check_out_date=booking.check_out_date,
-            booking=booking
-        )
+
+        listing = validated_data['listing']
+        check_in = validated_data['check_in_date']
+        check_out = validated_data['check_out_date']
+
+        with transaction.atomic():
+            # Параллельные брони одного объявления выстраиваются в очередь
+            # на его строке; брони разных объявлений не мешают друг другу.
+            # Под блокировкой повторяем проверку - validate() шла без нее.
+            AvailabilityService.lock_listing(listing.pk)
+            is_available, message = AvailabilityService.check_availability(
+                listing, check_in, check_out
+            )
+            if not is_available:
+                raise serializers.ValidationError({"dates": message})
+
+            # Все проверки модели уже выполнены в validate()
+            booking = Booking(**validated_data)
+            booking.save(validate=False)
+
+            # Блокируем даты в календаре
+            AvailabilityService.block_dates(
+                listing=booking.listing,
+                check_in_date=booking.check_in_date,
+                check_out_date=booking.check_out_date,
+                booking=booking
+            )
 
         return booking
 
@@ -363,7 +372,8 @@ class CancelBookingSerializer(serializers.Serializer):
     def validate(self, data):
         booking = self.context['booking']
 
-        if not booking.can_be_cancelled:
+        if cancellation_error(booking.status, booking.check_in_date,
+                              by_lessee=self.context.get('by_lessee', True)):
             raise serializers.ValidationError(
                 "Бронирование не может быть отменено"
             )
@@ -371,6 +381,71 @@ class CancelBookingSerializer(serializers.Serializer):
         return data
 
 
+class BookingBatchActionSerializer(serializers.Serializer):
+    """Список бронирований для пакетного подтверждения/отклонения/отмены"""
+
+    ids = serializers.ListField(
+        child=serializers.IntegerField(),
+        allow_empty=False,
+        max_length=MAX_IDS
+    )
+    reason = serializers.CharField(required=False, max_length=500, allow_blank=True, default='')
+
+
+class BookingLookupSerializer(serializers.Serializer):
+    """
+    Поиск бронирования гостем: на входе код и email,
+    на выходе - краткие данные бронирования (строка .values()).
+    """
+
+    booking_code = serializers.CharField(max_length=36)
+    guest_email = serializers.EmailField()
+
+    status = serializers.CharField(read_only=True)
+    listing_id = serializers.IntegerField(read_only=True)
+    listing_title = serializers.CharField(source='listing__title', read_only=True)
+    check_in_date = serializers.DateField(read_only=True)
+    check_out_date = serializers.DateField(read_only=True)
+    number_of_guests = serializers.IntegerField(read_only=True)
+    total_amount = serializers.DecimalField(max_digits=10, decimal_places=2, read_only=True)
+    is_paid = serializers.BooleanField(read_only=True)
+    created_at = serializers.DateTimeField(read_only=True)
+
+
+class BookingImportSerializer(serializers.Serializer):
+    """
+    Пакетный импорт: файл JSON Lines/CSV (multipart, поле file)
+    или JSON со списком строк в поле rows.
+    """
+
+    file = serializers.FileField(required=False)
+    rows = serializers.ListField(child=serializers.DictField(), required=False)
+    format = serializers.ChoiceField(choices=importer.FORMATS, required=False)
+    dry_run = serializers.BooleanField(default=False)
+
+    def validate(self, data):
+        upload = data.pop('file', None)
+        if (upload is None) == ('rows' not in data):
+            raise serializers.ValidationError("Передайте либо file, либо rows")
+
+        if upload is not None:
+            fmt = data.get('format') or upload.name.rsplit('.', 1)[-1].lower()
+            if fmt == 'ndjson':
+                fmt = 'jsonl'
+            try:
+                data['rows'] = importer.read_rows(
+                    io.TextIOWrapper(upload.file, encoding='utf-8-sig'), fmt
+                )
+            except (importer.ImportFormatError, UnicodeDecodeError) as e:
+                raise serializers.ValidationError({'file': str(e)})
+
+        if len(data['rows']) > importer.MAX_ROWS:
+            raise serializers.ValidationError({
+                'rows': f"Не более {importer.MAX_ROWS} строк за один запрос"
+            })
+        return data
+
+
 # class ConfirmBookingSerializer(serializers.Serializer):
 #     """Сериализатор для подтверждения/отклонения бронирования владельцем"""
 #
@@ -1,7 +1,7 @@
 from django.utils import timezone
 from rest_framework import serializers
-from apps.booking.models import Listing, Calendar
-from apps.booking.enums import BookingStatus, TimeSlot, AvailabilityStatus
+from apps.booking.enums import TimeSlot
+from apps.booking.availability import AvailabilityService
 
 
 class CalendarAvailabilityCheckSerializer(serializers.Serializer):
@@ -17,15 +17,6 @@ class CalendarAvailabilityCheckSerializer(serializers.Serializer):
     )
 
     def validate(self, data):
-        listing_id = data['listing_id']
-
-        try:
-            listing = Listing.objects.get(id=listing_id)
-        except Listing.DoesNotExist:
-            raise serializers.ValidationError({
-                'listing_id': 'Листинг не найден'
-            })
-
         check_in = data['check_in_date']
         check_out = data['check_out_date']
 
@@ -40,5 +31,34 @@ class CalendarAvailabilityCheckSerializer(serializers.Serializer):
                 'check_in_date': 'Дата заезда должна быть в будущем'
             })
 
-        data['listing'] = listing
+        range_error = AvailabilityService.range_error(check_in, check_out)
+        if range_error:
+            raise serializers.ValidationError({'check_out_date': range_error})
+
         return data
+
+
+class AvailabilityBatchItemSerializer(serializers.Serializer):
+    """Один запрос (объявление, заезд, выезд) в пакетной проверке"""
+
+    listing_id = serializers.IntegerField()
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+
+    def validate(self, data):
+        range_error = AvailabilityService.range_error(data['check_in_date'], data['check_out_date'])
+        if range_error:
+            raise serializers.ValidationError({'check_out_date': range_error})
+        return data
+
+
+class AvailabilityBatchSerializer(serializers.Serializer):
+    """Пакетная проверка доступности"""
+
+    MAX_ITEMS = 500
+
+    items = serializers.ListField(
+        child=AvailabilityBatchItemSerializer(),
+        allow_empty=False,
+        max_length=MAX_ITEMS
+    )
@@ -127,3 +127,47 @@ class ListingUpdateSerializer(serializers.ModelSerializer):
             'has_kitchen', 'has_balcony', 'has_parking', 'has_elevator',
             'has_furniture', 'has_internet', 'pets_allowed', 'smoking_allowed'
         ]
+
+
+class PriceQuoteSerializer(serializers.Serializer):
+    """Расчет стоимости проживания (PricingService.quote)"""
+
+    listing_id = serializers.IntegerField()
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+    guests = serializers.IntegerField()
+    nights = serializers.IntegerField()
+    base_price = serializers.DecimalField(max_digits=12, decimal_places=2)
+    discount = serializers.DecimalField(max_digits=12, decimal_places=2)
+    extra_guest_charge = serializers.DecimalField(max_digits=12, decimal_places=2)
+    total = serializers.DecimalField(max_digits=12, decimal_places=2)
+    is_available = serializers.BooleanField()
+    message = serializers.CharField()
+
+
+class QuoteBatchItemSerializer(serializers.Serializer):
+    """Один расчет (объявление, даты, гости) в пакетном запросе"""
+
+    listing_id = serializers.IntegerField()
+    check_in_date = serializers.DateField()
+    check_out_date = serializers.DateField()
+    guests = serializers.IntegerField(min_value=1, default=1)
+
+    def validate(self, data):
+        if data['check_out_date'] <= data['check_in_date']:
+            raise serializers.ValidationError({
+                'check_out_date': 'Дата выезда должна быть позже даты заезда'
+            })
+        return data
+
+
+class QuoteBatchSerializer(serializers.Serializer):
+    """Пакетный расчет стоимости для карточек поиска"""
+
+    MAX_ITEMS = 100
+
+    items = serializers.ListField(
+        child=QuoteBatchItemSerializer(),
+        allow_empty=False,
+        max_length=MAX_ITEMS
+    )
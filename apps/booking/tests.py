@@ -1,3 +1,697 @@
-from django.test import TestCase
+import csv
+import io
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib import admin
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from apps.booking import exports
+from apps.booking.admin import BookingAdmin
+from apps.booking.availability import AvailabilityService
+from apps.booking.cache_versions import bump_version, get_version
+from apps.booking.enums import BookingStatus, Role, Status
+from apps.booking.importer import import_bookings
+from apps.booking.interval_index import BookingIntervalIndex
+from apps.booking.jobs import compact_calendar, expire_pending_bookings
+from apps.booking.models import Address, Booking, IdempotencyKey, Listing, User
+from apps.booking.pricing import PricingService
+from apps.booking.serializers import BookingCreateSerializer
+from apps.booking.transitions import BookingTransitionService
+
+
+def make_user(username, role, **extra):
+    return User.objects.create(
+        username=username,
+        email=f"{username}@example.com",
+        first_name="Test",
+        last_name=username.capitalize(),
+        role=role,
+        **extra
+    )
+
+
+def make_listing(lessor, **extra):
+    address = Address.objects.create(
+        address="Teststraße 1",
+        city="Berlin",
+        state="Berlin",
+        postal_code="10115",
+    )
+    fields = {
+        'title': "Test listing",
+        'description': "Test",
+        'address': address,
+        'price': Decimal('100'),
+        'lessor': lessor,
+        'rooms': 1,
+        'bedrooms': 1,
+        'bathrooms': 1,
+        'area_sqm': 30,
+        'max_guests': 4,
+        'available_from': timezone.now().date(),
+        'status': Status.PUBLISHED.value,
+    }
+    fields.update(extra)
+    return Listing.objects.create(**fields)
+
+
+def make_booking(listing, lessee, check_in_date, check_out_date, status=BookingStatus.CONFIRMED.value):
+    """Бронирование с заблокированными ночами, как после создания через API"""
+    booking = Booking(
+        listing=listing,
+        lessee=lessee,
+        check_in_date=check_in_date,
+        check_out_date=check_out_date,
+        status=status,
+    )
+    booking.save(validate=False)
+    AvailabilityService.block_dates(listing, check_in_date, check_out_date, booking)
+    return booking
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    SILENCED_SYSTEM_CHECKS=['booking.E001'],
+)
+class BookingTestCase(TestCase):
+    # Отдельный кеш в памяти: тесты не трогают общий кеш (файловый или
+    # redis из CACHE_URL) и не зависят от его содержимого
+
+    def setUp(self):
+        cache.clear()
+        self.today = timezone.now().date()
+        self.lessor = make_user('lessor', Role.LESSOR.value)
+        self.lessee = make_user('lessee', Role.LESSEE.value, phone='+4915100000000')
+        self.listing = make_listing(self.lessor)
+
+    def day(self, offset):
+        return self.today + timedelta(days=offset)
+
+
+class AvailabilityConsistencyTests(BookingTestCase):
+    """
+    Изменения через любую точку входа (API создания, пакетные переходы,
+    импорт, cron-задачи) видны всем чтениям доступности, в том числе
+    закешированным: индексу бронирований, окнам и расчетам цены.
+    """
+
+    def setUp(self):
+        super().setUp()
+        self.check_in = self.today + timedelta(days=10)
+        self.check_out = self.today + timedelta(days=13)
+
+    def availability(self):
+        """(check_availability, есть ли окно в find_windows, is_available расчета)"""
+        is_available, _ = AvailabilityService.check_availability(
+            self.listing.pk, self.check_in, self.check_out
+        )
+        in_window = any(
+            window['start'] <= self.check_in and self.check_out <= window['end']
+            for window in AvailabilityService.find_windows(
+                self.listing, self.today, count=50, horizon_days=60
+            )
+        )
+        (quote,) = PricingService.cached_quotes([{
+            'listing': self.listing,
+            'check_in_date': self.check_in,
+            'check_out_date': self.check_out,
+            'guests': 1,
+        }])
+        return is_available, in_window, quote['is_available']
+
+    def assertAvailable(self):
+        self.assertEqual(self.availability(), (True, True, True))
+
+    def assertBusy(self):
+        self.assertEqual(self.availability(), (False, False, False))
+
+    def test_create_through_api(self):
+        self.assertAvailable()
+        client = APIClient()
+        client.force_authenticate(self.lessee)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post('/api/v1/bookings/', {
+                'listing': self.listing.pk,
+                'check_in_date': self.check_in,
+                'check_out_date': self.check_out,
+                'number_of_guests': 1,
+            }, format='json')
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertBusy()
+
+    def test_batch_transitions(self):
+        booking = make_booking(
+            self.listing, self.lessee, self.check_in, self.check_out, BookingStatus.PENDING.value
+        )
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingTransitionService.reject_many(self.lessor, [booking.pk])
+        self.assertAvailable()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = make_booking(self.listing, self.lessee, self.check_in, self.check_out)
+        self.assertBusy()
+        with self.captureOnCommitCallbacks(execute=True):
+            (result,) = BookingTransitionService.cancel_many(self.lessor, [booking.pk])
+        self.assertTrue(result['success'], result)
+        self.assertAvailable()
+
+    def test_import(self):
+        self.assertAvailable()
+        with self.captureOnCommitCallbacks(execute=True):
+            (result,) = import_bookings([{
+                'listing_id': self.listing.pk,
+                'check_in_date': self.check_in.isoformat(),
+                'check_out_date': self.check_out.isoformat(),
+                'guest_first_name': 'Import',
+                'guest_last_name': 'Guest',
+            }], lessor=self.lessor)
+        self.assertTrue(result['success'], result)
+        self.assertBusy()
+
+    def test_expire_pending_job(self):
+        booking = make_booking(
+            self.listing, self.lessee, self.check_in, self.check_out, BookingStatus.PENDING.value
+        )
+        Booking.objects.filter(pk=booking.pk).update(created_at=timezone.now() - timedelta(days=5))
+        self.assertBusy()
+        with self.captureOnCommitCallbacks(execute=True):
+            expired, released, _ = expire_pending_bookings(ttl_hours=48)
+        self.assertEqual((expired, released), (1, 3))
+        self.assertAvailable()
+
+    def test_compact_calendar(self):
+        past = self.today.replace(day=1) - timedelta(days=20)
+        make_booking(self.listing, self.lessee, past, past + timedelta(days=3), BookingStatus.COMPLETED.value)
+        version = get_version('calendar', self.listing.pk)
+        with self.captureOnCommitCallbacks(execute=True):
+            _, deleted = compact_calendar()
+        self.assertEqual(deleted, 3)
+        self.assertEqual(get_version('calendar', self.listing.pk), version + 1)
+
+    def test_admin_bulk_delete(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = make_booking(self.listing, self.lessee, self.check_in, self.check_out)
+        self.assertTrue(BookingIntervalIndex.for_listing(self.listing.pk).overlaps(self.check_in, self.check_out))
+        with self.captureOnCommitCallbacks(execute=True):
+            BookingAdmin(Booking, admin.site).delete_queryset(None, Booking.objects.filter(pk=booking.pk))
+        self.assertFalse(BookingIntervalIndex.for_listing(self.listing.pk).overlaps(self.check_in, self.check_out))
+
+    def test_interval_index_max_age(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            booking = make_booking(self.listing, self.lessee, self.check_in, self.check_out)
+        BookingIntervalIndex.for_listing(self.listing.pk)
+        # Изменение в обход Booking.save() версию не меняет
+        Booking.objects.filter(pk=booking.pk).update(status=BookingStatus.CANCELLED.value)
+        self.assertIsNotNone(BookingIntervalIndex.cached(self.listing.pk))
+        with mock.patch.object(BookingIntervalIndex, 'MAX_AGE_SECONDS', 0):
+            self.assertIsNone(BookingIntervalIndex.cached(self.listing.pk))
+            index = BookingIntervalIndex.for_listing(self.listing.pk)
+        self.assertFalse(index.overlaps(self.check_in, self.check_out))
+
+    def test_version_bumped_after_commit(self):
+        version = get_version('bookings', self.listing.pk)
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            bump_version('bookings', self.listing.pk)
+            self.assertEqual(get_version('bookings', self.listing.pk), version)
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(get_version('bookings', self.listing.pk), version + 1)
+
+
+class BookingQueryCountTests(BookingTestCase):
+    """Число запросов создания бронирования и переходов статусов"""
+
+    def create_serializer(self):
+        request = Request(APIRequestFactory().post('/api/v1/bookings/'))
+        request.user = self.lessee
+        return BookingCreateSerializer(data={
+            'listing': self.listing.pk,
+            'check_in_date': self.today + timedelta(days=5),
+            'check_out_date': self.today + timedelta(days=8),
+            'number_of_guests': 2,
+        }, context={'request': request})
+
+    def test_create_validate(self):
+        serializer = self.create_serializer()
+        # Объявление, доступность (календарь + бронирования), правила цен
+        with self.assertNumQueries(3):
+            self.assertTrue(serializer.is_valid(), serializer.errors)
+
+    def test_create(self):
+        serializer = self.create_serializer()
+        serializer.is_valid(raise_exception=True)
+        # Блокировка объявления, повторная проверка под ней, INSERT бронирования,
+        # блокировка ночей (вставка + UPDATE) и битовой карты (SELECT + INSERT),
+        # остальное - SAVEPOINT/RELEASE вложенных atomic()
+        with self.assertNumQueries(13):
+            booking = serializer.save()
+        self.assertEqual(booking.total_nights, 3)
+        self.assertEqual(booking.total_amount, Decimal('360.00'))
+        self.assertEqual(booking.guest_email, self.lessee.email)
+
+    def test_mark_as_confirmed(self):
+        booking = make_booking(
+            self.listing, self.lessee, self.today + timedelta(days=5),
+            self.today + timedelta(days=8), BookingStatus.PENDING.value
+        )
+        with self.assertNumQueries(1):
+            booking.mark_as_confirmed()
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, BookingStatus.CONFIRMED.value)
+        self.assertIsNotNone(booking.confirmed_at)
+
+    def test_mark_as_cancelled(self):
+        booking = make_booking(
+            self.listing, self.lessee, self.today + timedelta(days=5), self.today + timedelta(days=8)
+        )
+        with self.assertNumQueries(1):
+            booking.mark_as_cancelled(self.lessor, "Причина")
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, BookingStatus.CANCELLED.value)
+        self.assertEqual(booking.cancelled_by_id, self.lessor.pk)
+        self.assertEqual(booking.cancellation_reason, "Причина")
+
+    def test_mark_as_completed(self):
+        booking = make_booking(
+            self.listing, self.lessee, self.today + timedelta(days=5), self.today + timedelta(days=8)
+        )
+        with self.assertNumQueries(1):
+            booking.mark_as_completed()
+        booking.refresh_from_db()
+        self.assertEqual(booking.status, BookingStatus.COMPLETED.value)
+        self.assertIsNotNone(booking.completed_at)
+
+
+class BookingAmountTests(BookingTestCase):
+    """Пересчет total_amount при изменении бронирования через save()"""
+
+    def setUp(self):
+        super().setUp()
+        self.booking = make_booking(
+            self.listing, self.lessee, self.today + timedelta(days=5), self.today + timedelta(days=8)
+        )
+        self.booking.refresh_from_db()
+
+    def test_amount_kept_when_pricing_unchanged(self):
+        Booking.objects.filter(pk=self.booking.pk).update(total_amount=Decimal('250.00'))
+        booking = Booking.objects.get(pk=self.booking.pk)
+        booking.guest_notes = "Поздний заезд"
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_amount, Decimal('250.00'))
+
+    def test_dates_change_recalculates(self):
+        self.assertEqual(self.booking.total_amount, Decimal('300.00'))
+        self.booking.check_out_date = self.today + timedelta(days=11)
+        self.booking.save()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_nights, 6)
+        self.assertEqual(self.booking.total_amount, Decimal('600.00'))
+
+    def test_guests_change_recalculates(self):
+        self.booking.number_of_guests = 3
+        self.booking.save(update_fields=['number_of_guests'])
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_amount, Decimal('420.00'))
+
+    def test_price_change_recalculates(self):
+        self.booking.price = Decimal('80.00')
+        self.booking.save()
+        self.booking.refresh_from_db()
+        self.assertEqual(self.booking.total_amount, Decimal('240.00'))
+
+    def test_import_with_price_matches_recalculation(self):
+        check_in = self.today + timedelta(days=20)
+        (result,) = import_bookings([{
+            'listing_id': self.listing.pk,
+            'check_in_date': check_in.isoformat(),
+            'check_out_date': (check_in + timedelta(days=3)).isoformat(),
+            'number_of_guests': 2,
+            'price': '100',
+            'guest_first_name': 'Import',
+            'guest_last_name': 'Guest',
+        }], lessor=self.lessor)
+        self.assertTrue(result['success'], result)
+        booking = Booking.objects.get(pk=result['booking_id'])
+        self.assertEqual(booking.total_amount, Decimal('360.00'))
+
+        booking.price = Decimal('90.00')
+        booking.save()
+        booking.refresh_from_db()
+        self.assertEqual(booking.total_amount, Decimal('330.00'))
+
+
+class BookingEndpointQueryCountTests(BookingTestCase):
+    """
+    Число запросов списков и карточки бронирования не зависит от количества
+    строк: связанные объекты и даты календаря загружаются заранее
+    (BookingViewSet._shape_queryset).
+    """
+
+    def setUp(self):
+        super().setUp()
+        other_listing = make_listing(self.lessor, title="Second listing")
+        self.bookings = []
+        for number in range(4):
+            listing = self.listing if number % 2 else other_listing
+            start = self.today + timedelta(days=10 + number * 5)
+            self.bookings.append(make_booking(listing, self.lessee, start, start + timedelta(days=3)))
+            past = self.today - timedelta(days=40 - number * 5)
+            make_booking(listing, self.lessee, past, past + timedelta(days=3), BookingStatus.COMPLETED.value)
+            cancelled = make_booking(
+                listing, self.lessee, start + timedelta(days=100), start + timedelta(days=102)
+            )
+            cancelled.mark_as_cancelled(self.lessee, "Причина")
+        self.client = APIClient()
+        self.client.force_authenticate(self.lessee)
+
+    def assertListQueries(self, url, queries, rows):
+        with self.assertNumQueries(queries):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.data['results']), rows)
+        return response
+
+    def test_list(self):
+        # COUNT, страница с объявлением и арендатором
+        self.assertListQueries('/api/v1/bookings/', 2, 12)
+
+    def test_active(self):
+        # COUNT, страница, даты календаря
+        response = self.assertListQueries('/api/v1/bookings/active/', 3, 4)
+        self.assertEqual(len(response.data['results'][0]['calendar_dates']), 3)
+
+    def test_completed(self):
+        self.assertListQueries('/api/v1/bookings/completed/', 3, 4)
+
+    def test_cancelled(self):
+        self.assertListQueries('/api/v1/bookings/cancelled/', 3, 4)
+
+    def test_retrieve(self):
+        booking = self.bookings[0]
+        # Бронирование со связанными объектами, даты календаря
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/v1/bookings/{booking.pk}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['booking_code'], booking.booking_code)
+
+
+class IdempotencyTests(BookingTestCase):
+    """Повтор запроса с Idempotency-Key не создает второе бронирование"""
+
+    def setUp(self):
+        super().setUp()
+        self.client = APIClient()
+        self.client.force_authenticate(self.lessee)
+        self.payload = {
+            'listing': self.listing.pk,
+            'check_in_date': self.today + timedelta(days=5),
+            'check_out_date': self.today + timedelta(days=8),
+            'number_of_guests': 1,
+        }
+
+    def post(self, payload, key='key-1'):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/v1/bookings/', payload, format='json',
+                                    headers={'Idempotency-Key': key})
+
+    def test_replay(self):
+        first = self.post(self.payload)
+        self.assertEqual(first.status_code, 201, first.data)
+        second = self.post(self.payload)
+        self.assertEqual(second.status_code, 201)
+        self.assertEqual(second.headers['Idempotent-Replayed'], 'true')
+        self.assertEqual(second.data, first.data)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_other_body_rejected(self):
+        self.post(self.payload)
+        response = self.post({**self.payload, 'number_of_guests': 2})
+        self.assertEqual(response.status_code, 422)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_failure_before_response_saved_rolls_back(self):
+        # Воркер упал после создания бронирования, но до сохранения ответа
+        save = IdempotencyKey.save
+
+        def crash_on_response(record, *args, **kwargs):
+            if 'status_code' in kwargs.get('update_fields', ()):
+                raise RuntimeError
+            return save(record, *args, **kwargs)
+
+        with mock.patch.object(IdempotencyKey, 'save', autospec=True, side_effect=crash_on_response):
+            with self.assertRaises(RuntimeError):
+                self.post(self.payload)
+        self.assertFalse(Booking.objects.exists())
+        self.assertFalse(IdempotencyKey.objects.exists())
+
+        response = self.post(self.payload)
+        self.assertEqual(response.status_code, 201, response.data)
+        self.assertEqual(Booking.objects.count(), 1)
+
+
+class CancellationRulesTests(BookingTestCase):
+    """Одиночная и пакетная отмена подчиняются одним правилам"""
+
+    def setUp(self):
+        super().setUp()
+        # Заезд завтра: срок отмены для арендатора уже прошел
+        self.booking = make_booking(
+            self.listing, self.lessee, self.today + timedelta(days=1), self.today + timedelta(days=4)
+        )
+
+    def cancel(self, user):
+        client = APIClient()
+        client.force_authenticate(user)
+        return client.post(f'/api/v1/bookings/{self.booking.pk}/cancel/', {}, format='json')
+
+    def test_lessee_after_deadline(self):
+        response = self.cancel(self.lessee)
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['error'], "Отмена возможна только за 2 дня до заезда")
+
+    def test_lessor_single_and_batch_agree(self):
+        other = make_booking(
+            self.listing, self.lessee, self.today + timedelta(days=2), self.today + timedelta(days=3)
+        )
+        response = self.cancel(self.lessor)
+        self.assertEqual(response.status_code, 200, response.data)
+        (result,) = BookingTransitionService.cancel_many(self.lessor, [other.pk])
+        self.assertTrue(result['success'], result)
+
+
+class AvailabilityBatchTests(BookingTestCase):
+
+    def test_batch(self):
+        check_in = self.today + timedelta(days=10)
+        make_booking(self.listing, self.lessee, check_in, check_in + timedelta(days=3))
+        other = make_listing(self.lessor, title="Second listing")
+        items = [
+            {'listing_id': self.listing.pk, 'check_in_date': check_in + timedelta(days=1),
+             'check_out_date': check_in + timedelta(days=2)},
+            {'listing_id': self.listing.pk, 'check_in_date': check_in + timedelta(days=3),
+             'check_out_date': check_in + timedelta(days=5)},
+            {'listing_id': other.pk, 'check_in_date': check_in,
+             'check_out_date': check_in + timedelta(days=3)},
+            {'listing_id': 0, 'check_in_date': check_in,
+             'check_out_date': check_in + timedelta(days=3)},
+        ]
+        with self.assertNumQueries(3):
+            response = APIClient().post('/api/v1/bookings/availability/batch/', {'items': items},
+                                        format='json')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [result['is_available'] for result in response.data['results']],
+            [False, True, True, False]
+        )
+        self.assertEqual(response.data['results'][3]['message'], "Объявление не найдено")
+
+
+class KeysetPaginationTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        for number in range(5):
+            start = self.today + timedelta(days=10 + number * 5)
+            make_booking(self.listing, self.lessee, start, start + timedelta(days=2))
+        # Одинаковое значение поля сортировки - порядок задает id
+        Booking.objects.update(created_at=timezone.now())
+        self.client = APIClient()
+        self.client.force_authenticate(self.lessee)
+
+    def ids(self, response):
+        self.assertEqual(response.status_code, 200, response.data)
+        return [row['id'] for row in response.data['results']]
+
+    def test_forward_and_back_with_equal_values(self):
+        expected = list(Booking.objects.order_by('-created_at', '-id').values_list('id', flat=True))
+        response = self.client.get('/api/v1/bookings/?page_size=2')
+        pages = [self.ids(response)]
+        while response.data['next']:
+            response = self.client.get(response.data['next'])
+            pages.append(self.ids(response))
+        self.assertEqual(pages, [expected[0:2], expected[2:4], expected[4:]])
+
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), expected[2:4])
+        response = self.client.get(response.data['previous'])
+        self.assertEqual(self.ids(response), expected[0:2])
+        self.assertIsNone(response.data['previous'])
+
+
+class ListingCalendarTests(BookingTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.check_in = self.today + timedelta(days=10)
+        self.booking = make_booking(self.listing, self.lessee, self.check_in, self.check_in + timedelta(days=3))
+        start = self.today + timedelta(days=8)
+        self.url = (f'/api/v1/listings/{self.listing.pk}/calendar/'
+                    f'?start={start}&end={start + timedelta(days=8)}')
+
+    def test_spans(self):
+        response = APIClient().get(self.url)
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [(span['start'], span['end'], span['state'], span['booking_id'])
+             for span in response.data['spans']],
+            [
+                (self.today + timedelta(days=8), self.check_in, 'free', None),
+                (self.check_in, self.check_in + timedelta(days=3), 'busy', self.booking.pk),
+                (self.check_in + timedelta(days=3), self.today + timedelta(days=16), 'free', None),
+            ]
+        )
+
+    def test_etag_not_modified(self):
+        client = APIClient()
+        etag = client.get(self.url).headers['ETag']
+        response = client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+
+        make_booking(self.listing, self.lessee, self.today + timedelta(days=14), self.today + timedelta(days=15))
+        response = client.get(self.url, headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response.headers['ETag'], etag)
+
+
+class ListingWindowsTests(BookingTestCase):
+
+    def test_windows_skip_short_gaps(self):
+        day = self.day
+        make_booking(self.listing, self.lessee, day(3), day(5))
+        make_booking(self.listing, self.lessee, day(6), day(9))
+        response = APIClient().get(
+            f'/api/v1/listings/{self.listing.pk}/windows/?nights=2&horizon_days=12'
+        )
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(
+            [(window['start'], window['end']) for window in response.data['windows']],
+            [(day(0), day(3)), (day(9), day(12))]
+        )
+
+
+class BookingImportTests(BookingTestCase):
+
+    def test_csv_conflicts(self):
+        day = self.day
+        make_booking(self.listing, self.lessee, day(20), day(23))
+        content = (
+            "listing_id,check_in_date,check_out_date,guest_first_name,guest_last_name\n"
+            f"{self.listing.pk},{day(10)},{day(13)},Anna,First\n"
+            # Пересекается с первой строкой файла
+            f"{self.listing.pk},{day(12)},{day(14)},Boris,Second\n"
+            # Пересекается с существующим бронированием
+            f"{self.listing.pk},{day(22)},{day(25)},Clara,Third\n"
+            # Выезд в день заезда существующего бронирования - не конфликт
+            f"{self.listing.pk},{day(17)},{day(20)},Dmitri,Fourth\n"
+        )
+        client = APIClient()
+        client.force_authenticate(self.lessor)
+        response = client.post('/api/v1/bookings/import/', {
+            'file': SimpleUploadedFile('bookings.csv', content.encode(), content_type='text/csv'),
+        }, format='multipart')
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual((response.data['imported'], response.data['failed']), (2, 2))
+        self.assertEqual(
+            [(result['success'], 'dates' in result.get('errors', {})) for result in response.data['results']],
+            [(True, False), (False, True), (False, True), (True, False)]
+        )
+        self.assertEqual(Booking.objects.filter(listing=self.listing).count(), 3)
+
+
+class BookingLookupTests(BookingTestCase):
+
+    def lookup(self, code, email):
+        return APIClient().post('/api/v1/bookings/lookup/',
+                                {'booking_code': code, 'guest_email': email}, format='json')
+
+    def test_lookup_by_code(self):
+        booking = make_booking(self.listing, self.lessee, self.day(10), self.day(13))
+        self.assertEqual(len(booking.booking_code), 12)
+
+        response = self.lookup(f" {booking.booking_code.lower()} ", self.lessee.email.upper())
+        self.assertEqual(response.status_code, 200, response.data)
+        self.assertEqual(response.data['booking_code'], booking.booking_code)
+        self.assertEqual(response.data['check_in_date'], self.day(10).isoformat())
+
+        response = self.lookup(booking.booking_code, "other@example.com")
+        self.assertEqual(response.status_code, 404)
+
+
+class LessorAnalyticsTests(BookingTestCase):
+
+    def analytics(self, query=''):
+        client = APIClient()
+        client.force_authenticate(self.lessor)
+        response = client.get(f'/api/v1/listings/analytics/{query}')
+        self.assertEqual(response.status_code, 200, response.data)
+        return response.data['start'], response.data['end']
+
+    def test_default_start_for_feb_29(self):
+        self.assertEqual(self.analytics('?end=2028-02-29'), (date(2027, 2, 28), date(2028, 2, 29)))
+
+    def test_default_period_on_feb_29(self):
+        now = datetime(2028, 2, 29, 12, tzinfo=dt_timezone.utc)
+        with mock.patch('apps.booking.views.listings.timezone.now', return_value=now):
+            self.assertEqual(self.analytics(), (date(2027, 3, 1), date(2028, 3, 1)))
+
+
+class BookingExportTests(BookingTestCase):
+
+    def test_csv_pages_by_primary_key(self):
+        bookings = [
+            make_booking(self.listing, self.lessee, self.day(10 + number * 5), self.day(12 + number * 5))
+            for number in range(5)
+        ]
+        # Порции по 2 строки: 3 запроса со строками и 1 пустой в конце
+        with self.assertNumQueries(4):
+            content = ''.join(exports.export_lines(exports.export_queryset(lessor=self.lessor), 'csv',
+                                                   chunk_size=2))
+        rows = list(csv.DictReader(io.StringIO(content)))
+        self.assertEqual([int(row['id']) for row in rows], [booking.pk for booking in bookings])
+        self.assertEqual(rows[0]['booking_code'], bookings[0].booking_code)
+        self.assertEqual(rows[0]['check_in_date'], self.day(10).isoformat())
+
+
+class AvailabilityRangeLimitTests(BookingTestCase):
+
+    def test_long_range_rejected_before_query(self):
+        check_out = self.day(10 + settings.CALENDAR_HORIZON_DAYS + 1)
+        with self.assertNumQueries(0):
+            response = APIClient().get('/api/v1/bookings/availability/check/', {
+                'listing_id': self.listing.pk,
+                'check_in_date': self.day(10).isoformat(),
+                'check_out_date': check_out.isoformat(),
+            })
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            AvailabilityService.check_availability(self.listing.pk, self.day(10), check_out),
+            (False, response.data['error'])
+        )
@@ -0,0 +1,145 @@
+"""
+Пакетные переходы статусов бронирований для владельцев
+(подтверждение, отклонение, отмена сразу многих заявок).
+
+Права и статусы проверяются одним запросом на весь пакет, статус меняется
+одним UPDATE, ночи календаря блокируются/освобождаются пакетно.
+Результат - отдельный итог по каждому id.
+"""
+from datetime import timedelta
+
+from django.db import transaction
+from django.utils import timezone
+
+from apps.booking.availability import AvailabilityService
+from apps.booking.cache_versions import bump_version
+from apps.booking.enums import BookingStatus
+from apps.booking.models import Booking
+
+MAX_IDS = 500
+CANCELLABLE_STATUSES = [BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]
+
+
+def cancellation_error(status, check_in_date, by_lessee):
+    """
+    Правила отмены, общие для одиночной (BookingViewSet.cancel) и пакетной
+    (cancel_many) отмены: текст ошибки или None. Арендатор может отменить
+    не позже чем за 2 дня до заезда, владелец - в любой момент.
+    """
+    if status not in CANCELLABLE_STATUSES:
+        return "Можно отменить только ожидающие или подтвержденные бронирования"
+    if by_lessee and timezone.now().date() >= check_in_date - timedelta(days=2):
+        return "Отмена возможна только за 2 дня до заезда"
+    return None
+
+
+class BookingTransitionService:
+
+    @staticmethod
+    def _apply(user, ids, allowed_statuses, status_error, new_status, timestamp_field,
+               extra=None, block=False, free=False, check=None, allow_staff=False):
+        """
+        Общий сценарий пакетного перехода в new_status.
+        timestamp_field - поле даты перехода (confirmed_at, cancelled_at),
+        extra - дополнительные поля для UPDATE,
+        check(row) - дополнительная проверка строки, возвращает текст ошибки или None.
+        """
+        ids = list(dict.fromkeys(ids))
+        errors = {}
+
+        with transaction.atomic():
+            rows = {
+                row['id']: row
+                for row in Booking.objects.select_for_update().filter(
+                    id__in=ids, is_deleted=False
+                ).values(
+                    'id', 'status', 'listing_id', 'listing__lessor_id', 'lessee_id',
+                    'check_in_date', 'check_out_date'
+                )
+            }
+
+            accepted = []
+            for booking_id in ids:
+                row = rows.get(booking_id)
+                if row is None:
+                    errors[booking_id] = "Бронирование не найдено"
+                elif row['listing__lessor_id'] != user.pk and not (allow_staff and user.is_staff):
+                    errors[booking_id] = "Нет прав на это бронирование"
+                elif row['status'] not in allowed_statuses:
+                    errors[booking_id] = status_error
+                elif check and (error := check(row)):
+                    errors[booking_id] = error
+                else:
+                    accepted.append(row)
+
+            if accepted:
+                now = timezone.now()
+                Booking.objects.filter(id__in=[row['id'] for row in accepted]).update(
+                    status=new_status,
+                    updated_at=now,
+                    **{timestamp_field: now},
+                    **(extra or {})
+                )
+                stays = [
+                    (row['listing_id'], row['check_in_date'], row['check_out_date'], row['id'])
+                    for row in accepted
+                ]
+                if block:
+                    AvailabilityService.block_many(stays)
+                if free:
+                    AvailabilityService.free_many(stays)
+
+        for listing_id in {row['listing_id'] for row in accepted}:
+            bump_version('bookings', listing_id)
+
+        return [
+            {'booking_id': booking_id, 'success': False, 'error': errors[booking_id]}
+            if booking_id in errors else
+            {'booking_id': booking_id, 'success': True, 'new_status': new_status}
+            for booking_id in ids
+        ]
+
+    @staticmethod
+    def confirm_many(user, ids):
+        """Подтверждение ожидающих бронирований, ночи блокируются за ними"""
+        return BookingTransitionService._apply(
+            user, ids,
+            allowed_statuses=[BookingStatus.PENDING.value],
+            status_error="Подтвердить можно только ожидающее бронирование",
+            new_status=BookingStatus.CONFIRMED.value,
+            timestamp_field='confirmed_at',
+            block=True
+        )
+
+    @staticmethod
+    def reject_many(user, ids, reason=''):
+        """Отклонение ожидающих бронирований, ночи освобождаются"""
+        return BookingTransitionService._apply(
+            user, ids,
+            allowed_statuses=[BookingStatus.PENDING.value],
+            status_error="Отклонить можно только ожидающее бронирование",
+            new_status=BookingStatus.CANCELLED.value,
+            timestamp_field='cancelled_at',
+            extra={'cancelled_by': user, 'cancellation_reason': reason or 'Отклонено владельцем'},
+            free=True,
+            allow_staff=True
+        )
+
+    @staticmethod
+    def cancel_many(user, ids, reason=''):
+        """
+        Отмена ожидающих и подтвержденных бронирований владельцем
+        по тем же правилам, что и одиночная отмена (cancellation_error).
+        """
+        return BookingTransitionService._apply(
+            user, ids,
+            allowed_statuses=CANCELLABLE_STATUSES,
+            status_error="Можно отменить только ожидающие или подтвержденные бронирования",
+            new_status=BookingStatus.CANCELLED.value,
+            timestamp_field='cancelled_at',
+            extra={'cancelled_by': user, 'cancellation_reason': reason},
+            free=True,
+            check=lambda row: cancellation_error(
+                row['status'], row['check_in_date'], by_lessee=row['lessee_id'] == user.pk
+            )
+        )
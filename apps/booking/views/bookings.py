@@ -1,4 +1,4 @@
-from datetime import timedelta, datetime
+from datetime import datetime
 from rest_framework import status
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from apps.booking.permissions import (IsOwner,
@@ -7,19 +7,31 @@ from apps.booking.permissions import (IsOwner,
                                       IsLessor)
 from rest_framework.response import Response
 from rest_framework.decorators import action
-from apps.booking.models import Booking, Listing
+from apps.booking.models import Booking, Calendar, Listing
+from apps.booking.models.booking import normalize_booking_code
 from apps.booking.serializers import (BookingSerializer,
                                       BookingCreateSerializer,
                                       BookingUpdateSerializer,
                                       CancelBookingSerializer,
-                                      BookingListSerializer)
+                                      BookingListSerializer,
+                                      BookingImportSerializer,
+                                      BookingBatchActionSerializer,
+                                      BookingLookupSerializer,
+                                      AvailabilityBatchSerializer)
 from rest_framework.viewsets import ModelViewSet
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import OrderingFilter
+from rest_framework.throttling import ScopedRateThrottle
 from apps.booking.enums import BookingStatus
 from apps.booking.availability import AvailabilityService
-from django.db.models import Q
+from apps.booking.idempotency import idempotent
+from apps.booking.pagination import KeysetPagination
+from apps.booking.importer import import_bookings
+from apps.booking import exports
+from apps.booking.transitions import BookingTransitionService, cancellation_error
+from django.db.models import Prefetch, Q
 
 
 class BookingViewSet(ModelViewSet):
@@ -30,6 +42,14 @@ class BookingViewSet(ModelViewSet):
     filterset_fields = ['status', 'listing', 'lessee', 'is_paid']
     ordering_fields = ['check_in_date', 'created_at', 'total_amount']
     ordering = ['-created_at']
+    pagination_class = KeysetPagination
+    # Сортировка по умолчанию для списков-действий (см. KeysetPagination)
+    action_ordering = {
+        'active': 'check_in_date',
+        'completed': '-check_in_date',
+    }
+    # Ограничение частоты для поиска гостем (DEFAULT_THROTTLE_RATES)
+    throttle_scope = 'booking_lookup'
 
     def get_serializer_class(self):
         if self.action == 'create':
@@ -43,33 +63,69 @@ class BookingViewSet(ModelViewSet):
     def get_permissions(self):
         if self.action == 'create':
             return [AllowAny()]
-        elif self.action == 'check_availability':
+        elif self.action in ['check_availability', 'check_availability_batch', 'lookup']:
             return [AllowAny()]
         elif self.action in ['update', 'partial_update', 'destroy']:
             return [IsOwner()]
         elif self.action == 'cancel':
             return[IsAuthenticated(), CanCancelBooking()]
-        elif self.action in ['confirm', 'reject']:
+        elif self.action in ['confirm', 'reject', 'batch_confirm', 'batch_reject', 'batch_cancel']:
             return [IsAuthenticated(), IsLessor()]
-        elif self.action in ['list', 'retrieve', 'active', 'completed', 'cancelled']:
+        elif self.action in ['list', 'retrieve', 'active', 'completed', 'cancelled',
+                             'import_bookings', 'export']:
             return [IsAuthenticated()]
 
         return super().get_permissions()
 
+    def get_throttles(self):
+        if self.action == 'lookup':
+            return [ScopedRateThrottle()]
+        return super().get_throttles()
+
     def get_queryset(self):
         user = self.request.user
 
         if user.is_authenticated:
             if hasattr(user, 'role') and user.role == 'lessor':
-                return Booking.objects.filter(
+                queryset = Booking.objects.filter(
                     Q(listing__lessor=user) | Q(lessee=user)
                 )
             else:
-                return Booking.objects.filter(lessee=user)
+                queryset = Booking.objects.filter(lessee=user)
+            return self._shape_queryset(queryset)
 
         return Booking.objects.none()
 
+    def _shape_queryset(self, queryset):
+        """
+        Связанные данные под сериализатор действия: без них каждая строка
+        ответа добирает объявление, адрес, владельца, арендатора и даты
+        календаря отдельными запросами.
+        """
+        if self.action == 'list':
+            # BookingListSerializer: listing.title, lessee.get_full_name
+            return queryset.select_related('listing', 'lessee')
+        if self.action in ['retrieve', 'active', 'completed', 'cancelled']:
+            # BookingSerializer: объявление с адресом и владельцем, арендатор, даты календаря
+            return queryset.select_related(
+                'listing__address', 'listing__lessor', 'lessee'
+            ).prefetch_related(
+                Prefetch(
+                    'calendar_days',
+                    queryset=Calendar.objects.order_by('target_date').only('id', 'booking_id', 'target_date')
+                )
+            )
+        if self.action in ['cancel', 'confirm', 'reject']:
+            # Проверка прав обращается к booking.listing.lessor
+            return queryset.select_related('listing')
+        return queryset
+
+    @idempotent
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
     @action(detail=True, methods=['post'])
+    @idempotent
     def cancel(self, request, pk=None):
         """Отмена бронирования"""
         booking = self.get_object()
@@ -84,23 +140,14 @@ class BookingViewSet(ModelViewSet):
                 status=status.HTTP_403_FORBIDDEN
             )
 
-        if is_lessee:
-            if booking.status not in [BookingStatus.PENDING.value, BookingStatus.CONFIRMED.value]:
-                return Response(
-                    {'error': 'Можно отменить только ожидающие или подтвержденные бронирования'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
-            # Проверяем срок (за 2 дня до заезда)
-            cancellation_deadline = booking.check_in_date - timedelta(days=2)
-            if timezone.now().date() >= cancellation_deadline:
-                return Response(
-                    {'error': 'Отмена возможна только за 2 дня до заезда'},
-                    status=status.HTTP_400_BAD_REQUEST
-                )
+        # Статус и срок (за 2 дня до заезда для арендатора) - как в пакетной отмене
+        error = cancellation_error(booking.status, booking.check_in_date, by_lessee=is_lessee)
+        if error:
+            return Response({'error': error}, status=status.HTTP_400_BAD_REQUEST)
 
         serializer = CancelBookingSerializer(
             data=request.data,
-            context={'booking': booking}
+            context={'booking': booking, 'by_lessee': is_lessee}
         )
 
         if serializer.is_valid():
@@ -133,6 +180,7 @@ class BookingViewSet(ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def confirm(self, request, pk=None):
         """Подтверждение бронирования владельцем"""
         booking = self.get_object()
@@ -167,6 +215,7 @@ class BookingViewSet(ModelViewSet):
         )
 
     @action(detail=True, methods=['post'])
+    @idempotent
     def reject(self, request, pk=None):
         """Отклонение бронирования владельцем"""
         booking = self.get_object()
@@ -210,6 +259,11 @@ class BookingViewSet(ModelViewSet):
             status=status.HTTP_200_OK
         )
 
+    def _paginated(self, queryset):
+        page = self.paginate_queryset(queryset)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
     @action(detail=False, methods=['get'])
     def completed(self, request):
         """завершенные бронирования"""
@@ -218,8 +272,7 @@ class BookingViewSet(ModelViewSet):
             check_out_date__lt=timezone.now().date()
         )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._paginated(queryset)
 
     @action(detail=False, methods=['get'])
     def active(self, request):
@@ -232,8 +285,7 @@ class BookingViewSet(ModelViewSet):
             check_out_date__gte=timezone.now().date()
         )
 
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._paginated(queryset)
 
 
     @action(detail=False, methods=['get'])
@@ -242,8 +294,7 @@ class BookingViewSet(ModelViewSet):
         queryset = self.get_queryset().filter(
             status=BookingStatus.CANCELLED.value
         )
-        serializer = self.get_serializer(queryset, many=True)
-        return Response(serializer.data)
+        return self._paginated(queryset)
 
     @action(detail=False, methods=['get'], url_path='availability/check')
     def check_availability(self, request):
@@ -258,13 +309,21 @@ class BookingViewSet(ModelViewSet):
                 status=status.HTTP_400_BAD_REQUEST
             )
         try:
-            listing = Listing.objects.get(id=listing_id)
+            listing_id = int(listing_id)
             check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
             check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
-        except:
+        except ValueError:
             return Response({"error": "Некорректные данные"}, status=status.HTTP_400_BAD_REQUEST)
 
-        is_available, message = AvailabilityService.check_availability(listing, check_in, check_out)
+        # Длина периода ограничена до построения запроса
+        range_error = AvailabilityService.range_error(check_in, check_out)
+        if range_error:
+            return Response({"error": range_error}, status=status.HTTP_400_BAD_REQUEST)
+
+        try:
+            is_available, message = AvailabilityService.check_availability(listing_id, check_in, check_out)
+        except Listing.DoesNotExist:
+            return Response({"error": "Некорректные данные"}, status=status.HTTP_400_BAD_REQUEST)
 
         return Response({
             "is_available": is_available,
@@ -272,4 +331,193 @@ class BookingViewSet(ModelViewSet):
             "listing_id": listing_id,
             "check_in_date": check_in_str,
             "check_out_date": check_out_str
-        })
\ No newline at end of file
+        })
+
+    @action(detail=False, methods=['post'], url_path='availability/batch')
+    def check_availability_batch(self, request):
+        """
+        Пакетная проверка доступности
+        POST /api/v1/bookings/availability/batch/
+        {"items": [{"listing_id": 1, "check_in_date": "...", "check_out_date": "..."}, ...]}
+        До 500 элементов, не более 3 запросов к БД на пакет.
+        """
+        serializer = AvailabilityBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data['items']
+        results = AvailabilityService.check_availability_batch(items)
+
+        return Response({
+            "results": [
+                {
+                    "listing_id": item['listing_id'],
+                    "check_in_date": item['check_in_date'],
+                    "check_out_date": item['check_out_date'],
+                    "is_available": is_available,
+                    "message": message,
+                }
+                for item, (is_available, message) in zip(items, results)
+            ]
+        })
+
+    @action(detail=False, methods=['post'], url_path='import')
+    def import_bookings(self, request):
+        """
+        Пакетный импорт бронирований из внешних календарей
+        POST /api/v1/bookings/import/
+        multipart: file=<bookings.jsonl|bookings.csv>[, format=jsonl|csv][, dry_run=true]
+        или JSON: {"rows": [{"listing_id": 1, "check_in_date": "...", ...}], "dry_run": false}
+        Владелец импортирует только в свои объявления, администратор - в любые.
+        Ответ - итог по каждой строке.
+        """
+        user = request.user
+        if not user.is_staff and getattr(user, 'role', None) != 'lessor':
+            return Response(
+                {'error': 'Импорт доступен только владельцам жилья'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        serializer = BookingImportSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        dry_run = serializer.validated_data['dry_run']
+        results = import_bookings(
+            serializer.validated_data['rows'],
+            lessor=None if user.is_staff else user,
+            dry_run=dry_run
+        )
+        imported = sum(1 for result in results if result['success'])
+
+        return Response({
+            'dry_run': dry_run,
+            'imported': imported,
+            'failed': len(results) - imported,
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'])
+    def lookup(self, request):
+        """
+        Поиск бронирования гостем без авторизации
+        POST /api/v1/bookings/lookup/  {"booking_code": "...", "guest_email": "..."}
+        POST, а не GET - чтобы email не попадал в логи по URL.
+        Один запрос по уникальному индексу booking_code; неверный код
+        и неверный email неразличимы в ответе.
+        """
+        serializer = BookingLookupSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        booking = Booking.objects.filter(
+            booking_code=normalize_booking_code(data['booking_code']),
+            guest_email__iexact=data['guest_email'],
+            is_deleted=False
+        ).values(
+            'booking_code', 'guest_email', 'status', 'listing_id', 'listing__title',
+            'check_in_date', 'check_out_date', 'number_of_guests', 'total_amount',
+            'is_paid', 'created_at'
+        ).first()
+        if booking is None:
+            return Response({'error': 'Бронирование не найдено'}, status=status.HTTP_404_NOT_FOUND)
+
+        return Response(BookingLookupSerializer(booking).data)
+
+    @action(detail=False, methods=['get'])
+    def export(self, request):
+        """
+        Потоковая выгрузка бронирований
+        GET /api/v1/bookings/export/?type=csv|jsonl[&status=...][&listing=...]
+            [&check_in_from=YYYY-MM-DD][&check_in_to=YYYY-MM-DD]
+        Владелец выгружает бронирования своих объявлений, администратор - все.
+        (?format= занят DRF под выбор рендерера, поэтому формат - в ?type=)
+        """
+        user = request.user
+        if not user.is_staff and getattr(user, 'role', None) != 'lessor':
+            return Response(
+                {'error': 'Выгрузка доступна только владельцам жилья'},
+                status=status.HTTP_403_FORBIDDEN
+            )
+
+        params = request.query_params
+        fmt = params.get('type', 'csv')
+        if fmt not in exports.FORMATS:
+            return Response(
+                {'error': f"Формат выгрузки: {', '.join(exports.FORMATS)}"},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        filters = {}
+        try:
+            for param in ('check_in_from', 'check_in_to'):
+                if params.get(param):
+                    filters[param] = datetime.strptime(params[param], '%Y-%m-%d').date()
+            if params.get('listing'):
+                filters['listing_id'] = int(params['listing'])
+        except ValueError:
+            return Response(
+                {'error': 'Формат дат: YYYY-MM-DD, listing - id объявления'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        queryset = exports.export_queryset(
+            lessor=None if user.is_staff else user,
+            status=params.get('status'),
+            **filters
+        )
+        response = StreamingHttpResponse(
+            exports.export_lines(queryset, fmt),
+            content_type=exports.CONTENT_TYPES[fmt]
+        )
+        filename = f"bookings-{timezone.now():%Y%m%d}.{fmt}"
+        response['Content-Disposition'] = f'attachment; filename="{filename}"'
+        return response
+
+    def _batch_transition(self, request, transition):
+        serializer = BookingBatchActionSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        data = serializer.validated_data
+        if transition == 'confirm':
+            results = BookingTransitionService.confirm_many(request.user, data['ids'])
+        elif transition == 'reject':
+            results = BookingTransitionService.reject_many(request.user, data['ids'], data['reason'])
+        else:
+            results = BookingTransitionService.cancel_many(request.user, data['ids'], data['reason'])
+
+        updated = sum(1 for result in results if result['success'])
+        return Response({
+            'updated': updated,
+            'failed': len(results) - updated,
+            'results': results,
+        })
+
+    @action(detail=False, methods=['post'], url_path='batch/confirm')
+    @idempotent
+    def batch_confirm(self, request):
+        """
+        Пакетное подтверждение
+        POST /api/v1/bookings/batch/confirm/  {"ids": [1, 2, 3]}
+        """
+        return self._batch_transition(request, 'confirm')
+
+    @action(detail=False, methods=['post'], url_path='batch/reject')
+    @idempotent
+    def batch_reject(self, request):
+        """
+        Пакетное отклонение ожидающих бронирований
+        POST /api/v1/bookings/batch/reject/  {"ids": [1, 2, 3], "reason": "..."}
+        """
+        return self._batch_transition(request, 'reject')
+
+    @action(detail=False, methods=['post'], url_path='batch/cancel')
+    @idempotent
+    def batch_cancel(self, request):
+        """
+        Пакетная отмена владельцем
+        POST /api/v1/bookings/batch/cancel/  {"ids": [1, 2, 3], "reason": "..."}
+        """
+        return self._batch_transition(request, 'cancel')
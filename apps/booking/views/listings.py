@@ -1,13 +1,23 @@
+import hashlib
+from datetime import datetime, timedelta
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from rest_framework.response import Response
+from rest_framework.exceptions import ValidationError
+from rest_framework import status
+from django.utils import timezone
+from apps.booking.availability import AvailabilityService
+from apps.booking.pricing import PricingService
+from apps.booking.analytics import lessor_analytics
 from apps.booking.permissions import IsOwnerOrReadOnly, IsLessor
-from apps.booking.models import Listing
-from apps.booking.serializers import ListingUpdateSerializer,ListingSerializer, ListingDetailedSerializer
+from apps.booking.models import Listing, Booking, Calendar
+from apps.booking.enums import BookingStatus
+from apps.booking.serializers import (ListingUpdateSerializer, ListingSerializer, ListingDetailedSerializer,
+                                      PriceQuoteSerializer, QuoteBatchSerializer)
 from rest_framework.viewsets import ModelViewSet
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework.filters import SearchFilter, OrderingFilter
 from rest_framework.decorators import action
-from django.db.models import Q
+from django.db.models import Q, Exists, OuterRef
 
 # ViewSet  для работы с объявлениями.
 
@@ -41,6 +51,8 @@ class ListingViewSet(ModelViewSet):
         elif self.action in ['update', 'partial_update', 'destroy',
                            'toggle_availability', 'publish']:
             return [IsAuthenticated(), IsLessor(), IsOwnerOrReadOnly()]
+        elif self.action == 'analytics':
+            return [IsAuthenticated(), IsLessor()]
         elif self.action == 'my':
             # /my/ доступен любому авторизованному (покажет свои объявления если есть)
             return [IsAuthenticated()]
@@ -148,8 +160,57 @@ class ListingViewSet(ModelViewSet):
         if max_area:
             queryset = queryset.filter(area_sqm__lte=float(max_area))
 
+        # Свободно в период [check_in, check_out)
+        check_in = params.get('check_in')
+        check_out = params.get('check_out')
+        if check_in or check_out:
+            queryset = self._filter_available_between(queryset, check_in, check_out)
+
         return queryset
 
+    @staticmethod
+    def _filter_available_between(queryset, check_in_str, check_out_str):
+        """
+        Оставляет объявления, свободные с check_in по check_out.
+        Занятость проверяется в том же SQL через NOT EXISTS по бронированиям
+        и закрытым дням календаря (индексы listing+даты).
+        """
+        if not (check_in_str and check_out_str):
+            raise ValidationError({'check_in': 'Необходимо указать check_in и check_out'})
+        try:
+            check_in = datetime.strptime(check_in_str, '%Y-%m-%d').date()
+            check_out = datetime.strptime(check_out_str, '%Y-%m-%d').date()
+        except ValueError:
+            raise ValidationError({'check_in': 'Формат дат: YYYY-MM-DD'})
+
+        nights = (check_out - check_in).days
+        if nights <= 0:
+            raise ValidationError({'check_out': 'Дата выезда должна быть позже даты заезда'})
+
+        busy_bookings = Booking.objects.filter(
+            listing=OuterRef('pk'),
+            check_in_date__lt=check_out,
+            check_out_date__gt=check_in,
+            status__in=BookingStatus.active(),
+            is_deleted=False
+        )
+        busy_days = Calendar.objects.filter(
+            listing=OuterRef('pk'),
+            target_date__gte=check_in,
+            target_date__lt=check_out,
+            is_available=False
+        )
+
+        return queryset.filter(
+            Q(max_stay_days__isnull=True) | Q(max_stay_days__gte=nights),
+            # available_until - последняя ночь, которую можно забронировать
+            Q(available_until__isnull=True) | Q(available_until__gte=check_out - timedelta(days=1)),
+            ~Exists(busy_bookings),
+            ~Exists(busy_days),
+            min_stay_days__lte=nights,
+            available_from__lte=check_in,
+        )
+
     def perform_create(self, serializer):
         """При создании автоматически назначаем владельца"""
         serializer.save(lessor=self.request.user)
@@ -213,4 +274,174 @@ class ListingViewSet(ModelViewSet):
             'published_at': listing.published_at
         })
 
+    @action(detail=True, methods=['get'])
+    def calendar(self, request, pk=None):
+        """
+        Календарь доступности в виде RLE-отрезков.
+        GET /api/v1/listings/{id}/calendar/?start=YYYY-MM-DD&end=YYYY-MM-DD
+        По умолчанию - 2 месяца от сегодня, максимум 12 месяцев.
+        Поддерживает If-None-Match (ETag по последнему Calendar.updated_at).
+        """
+        listing = self.get_object()
+        try:
+            start = request.query_params.get('start')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else timezone.now().date()
+            end = request.query_params.get('end')
+            end = datetime.strptime(end, '%Y-%m-%d').date() if end else start + timedelta(days=61)
+        except ValueError:
+            return Response({'error': 'Формат дат: YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if end <= start:
+            return Response({'error': 'end должен быть позже start'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > 366:
+            return Response({'error': 'Максимальный период - 12 месяцев'}, status=status.HTTP_400_BAD_REQUEST)
+
+        spans, last_updated, rows_count = AvailabilityService.calendar_spans(listing, start, end)
+
+        etag = '"%s"' % hashlib.md5(
+            f"{listing.pk}:{start}:{end}:{last_updated}:{rows_count}".encode()
+        ).hexdigest()
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=status.HTTP_304_NOT_MODIFIED, headers={'ETag': etag})
+
+        return Response({
+            'listing_id': listing.pk,
+            'start': start,
+            'end': end,
+            'spans': spans,
+        }, headers={'ETag': etag})
+
+    @action(detail=True, methods=['get'])
+    def windows(self, request, pk=None):
+        """
+        Ближайшие свободные окна для бронирования.
+        GET /api/v1/listings/{id}/windows/?from=YYYY-MM-DD&nights=3&count=5&horizon_days=365
+        """
+        listing = self.get_object()
+        params = request.query_params
+        try:
+            start = params.get('from')
+            start = datetime.strptime(start, '%Y-%m-%d').date() if start else timezone.now().date()
+            nights = int(params.get('nights', 1))
+            count = int(params.get('count', 5))
+            horizon_days = int(params.get('horizon_days', 365))
+        except ValueError:
+            return Response({'error': 'Некорректные параметры'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if nights < 1 or not 1 <= count <= 50 or not 1 <= horizon_days <= 730:
+            return Response(
+                {'error': 'nights >= 1, count от 1 до 50, horizon_days от 1 до 730'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        windows = AvailabilityService.find_windows(listing, start, nights, count, horizon_days)
+
+        return Response({
+            'listing_id': listing.pk,
+            'min_stay_days': listing.min_stay_days,
+            'max_stay_days': listing.max_stay_days,
+            'windows': windows,
+        })
+
+    @action(detail=True, methods=['get'])
+    def quote(self, request, pk=None):
+        """
+        Расчет стоимости проживания по правилам цен объявления.
+        GET /api/v1/listings/{id}/quote/?check_in_date=YYYY-MM-DD&check_out_date=YYYY-MM-DD&guests=2
+        """
+        listing = self.get_object()
+        params = request.query_params
+        try:
+            check_in = datetime.strptime(params.get('check_in_date', ''), '%Y-%m-%d').date()
+            check_out = datetime.strptime(params.get('check_out_date', ''), '%Y-%m-%d').date()
+            guests = int(params.get('guests', 1))
+        except ValueError:
+            return Response(
+                {'error': 'Необходимы check_in_date, check_out_date (YYYY-MM-DD) и guests'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        if check_out <= check_in:
+            return Response({'error': 'Дата выезда должна быть позже даты заезда'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not 1 <= guests <= listing.max_guests:
+            return Response({'error': f'Количество гостей: от 1 до {listing.max_guests}'},
+                            status=status.HTTP_400_BAD_REQUEST)
+
+        (quote,) = PricingService.cached_quotes([{
+            'listing': listing,
+            'check_in_date': check_in,
+            'check_out_date': check_out,
+            'guests': guests,
+        }])
+        return Response(PriceQuoteSerializer({
+            'listing_id': listing.pk,
+            'check_in_date': check_in,
+            'check_out_date': check_out,
+            'guests': guests,
+            **quote,
+        }).data)
+
+    @action(detail=False, methods=['post'], url_path='quote/batch')
+    def quote_batch(self, request):
+        """
+        Пакетный расчет стоимости для карточек поиска
+        POST /api/v1/listings/quote/batch/
+        {"items": [{"listing_id": 1, "check_in_date": "...", "check_out_date": "...", "guests": 2}, ...]}
+        До 100 элементов. Расчеты берутся из кеша; промахи считаются
+        вместе, фиксированным числом запросов на пакет.
+        """
+        serializer = QuoteBatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        items = serializer.validated_data['items']
+        listings = self.get_queryset().in_bulk({item['listing_id'] for item in items})
+
+        results = [None] * len(items)
+        to_quote = []
+        for index, item in enumerate(items):
+            listing = listings.get(item['listing_id'])
+            if listing is None:
+                results[index] = {**item, 'error': 'Объявление не найдено'}
+            elif item['guests'] > listing.max_guests:
+                results[index] = {**item, 'error': f'Максимальное количество гостей: {listing.max_guests}'}
+            else:
+                to_quote.append((index, {**item, 'listing': listing}))
+
+        quotes = PricingService.cached_quotes([item for _, item in to_quote]) if to_quote else []
+        for (index, item), quote in zip(to_quote, quotes):
+            results[index] = PriceQuoteSerializer({**item, **quote}).data
+
+        return Response({'results': results})
+
+    @action(detail=False, methods=['get'])
+    def analytics(self, request):
+        """
+        Загрузка, ADR, RevPAR и выручка по месяцам для объявлений владельца.
+        GET /api/v1/listings/analytics/?start=YYYY-MM-DD&end=YYYY-MM-DD
+        По умолчанию - последние 12 месяцев включая текущий, максимум 24 месяца.
+        """
+        params = request.query_params
+        try:
+            start, end = (
+                datetime.strptime(params[name], '%Y-%m-%d').date() if params.get(name) else None
+                for name in ('start', 'end')
+            )
+        except ValueError:
+            return Response({'error': 'Формат дат: YYYY-MM-DD'}, status=status.HTTP_400_BAD_REQUEST)
+
+        if end is None:
+            this_month = timezone.now().date().replace(day=1)
+            end = (this_month + timedelta(days=32)).replace(day=1)
+        if start is None:
+            # Год назад; у 29 февраля в прошлом году пары нет - берем 28-е
+            day = 28 if (end.month, end.day) == (2, 29) else end.day
+            start = end.replace(year=end.year - 1, day=day)
+
+        if end <= start:
+            return Response({'error': 'end должен быть позже start'}, status=status.HTTP_400_BAD_REQUEST)
+        if (end - start).days > 731:
+            return Response({'error': 'Максимальный период - 24 месяца'}, status=status.HTTP_400_BAD_REQUEST)
 
+        return Response(lessor_analytics(request.user, start, end))
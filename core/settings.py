@@ -141,6 +141,10 @@ REST_FRAMEWORK = {
         'django_filters.rest_framework.DjangoFilterBackend',
         # ...
     ],
+    # Только для действий с throttle_scope (поиск бронирования гостем)
+    'DEFAULT_THROTTLE_RATES': {
+        'booking_lookup': env('BOOKING_LOOKUP_THROTTLE_RATE', default='30/min'),
+    },
 }
 
 from datetime import timedelta
@@ -158,6 +162,30 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
     'TOKEN_TYPE_CLAIM': 'token_type'
 }
+# Кеш должен быть общим для всех процессов (веб-воркеры и cron-команды):
+# в нем хранятся версии данных (apps/booking/cache_versions.py), таблицы цен
+# и расчеты. По умолчанию - файловый кеш для разработки и одного сервера.
+# Он удаляет часть записей при превышении MAX_ENTRIES (у Django - 300,
+# что меньше версий и расчетов даже небольшого сайта), поэтому лимит поднят;
+# каждая запись в нем просматривает каталог кеша. В продакшене укажите
+# CACHE_URL на redis (redis://host:6379/1) или memcached.
+CACHES = {
+    'default': env.cache(
+        'CACHE_URL',
+        default=f'filecache://{BASE_DIR / ".cache" / "django"}?max_entries=20000'
+    ),
+}
+
+# Горизонт материализации календаря (команда materialize_calendar), ~18 месяцев
+CALENDAR_HORIZON_DAYS = env.int('CALENDAR_HORIZON_DAYS', default=548)
+
+# Сколько хранятся ответы на запросы с Idempotency-Key
+IDEMPOTENCY_KEY_TTL_HOURS = env.int('IDEMPOTENCY_KEY_TTL_HOURS', default=24)
+
+# Через сколько часов неподтвержденное (pending) бронирование истекает
+# и освобождает даты (команда expire_pending_bookings)
+PENDING_BOOKING_TTL_HOURS = env.int('PENDING_BOOKING_TTL_HOURS', default=48)
+
 # Настройки Swagger (drf-yasg)
 SWAGGER_SETTINGS = {
     'USE_SESSION_AUTH': False,  # отключить сессии
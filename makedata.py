@@ -19,6 +19,7 @@ from apps.booking.models import (
 from apps.booking.enums import (
     Role, PropertyType, Status, BookingStatus
 )
+from apps.booking.jobs import materialize_calendar
 
 # Настройка Faker для немецких данных
 faker = Faker('de_DE')
@@ -631,6 +632,8 @@ def main():
 
     # Создание календаря (самая важная часть)
     create_calendar_entries_smart(listings, bookings, days_range=90)
+    # Достраиваем календарь опубликованных объявлений на весь горизонт
+    materialize_calendar()
 
     # Опционально: история поиска и просмотров
     create_search_history(users, 30)